@@ -1,68 +1,205 @@
 """The NOAA Solar integration."""
 from __future__ import annotations
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import logging
 from datetime import timedelta
+from functools import partial
+from shutil import rmtree
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform, CONF_HOST, CONF_SCAN_INTERVAL
-from homeassistant.core import HomeAssistant
+from homeassistant.const import (
+    Platform,
+    CONF_HOST,
+    CONF_SCAN_INTERVAL,
+    EVENT_HOMEASSISTANT_STOP,
+)
+from homeassistant.core import Event, HomeAssistant
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.typing import ConfigType
 
-from .api import NOAASpaceApi
+from .api import NOAASpaceApi, create_session, response_cache_directory
+from .common import images_directory, renders_directory
 from .coordinator import (
-    NOAASolarActivityUpdateCoordinator,
-    NOAASolarMagFieldUpdateCoordinator,
+    NOAASolarAnimationUpdateCoordinator,
+    NOAASolarSummaryUpdateCoordinator,
+    NOAASolarTimeSeriesUpdateCoordinator,
     NOAASolarUpdateCoordinator,
-    NOAASolarWindSpeedUpdateCoordinator,
-    NOAASolarSuvi304UpdateCoordinator,
-    NOAASolarLascoC3UpdateCoordinator,
+    storage_key,
+)
+from .products import (
+    ANIMATION_PRODUCTS,
+    DATA_PRODUCTS,
+    DEFAULT_PRODUCTS,
+    PRODUCTS,
+    TIME_SERIES_PRODUCTS,
+    NOAASolarProductDescription,
 )
+from .services import async_setup_services
+from .statistics import NOAASolarStatisticsImporter
 
 from .const import (
     DOMAIN,
+    DATA_REQUEST_LIMITER,
+    SUMMARY_KEY,
+    API_MAX_CONCURRENT_REQUESTS,
     CONF_DATA_SCAN_INTERVAL,
     CONF_IMAGE_SCAN_INTERVAL,
+    CONF_PRODUCTS,
     DEFAULT_IMAGE_SCAN_INTERVAL,
+    IMAGE_PIPELINE_WORKERS,
+    STORAGE_VERSION,
 )
 
 PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.IMAGE]
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 _LOGGER = logging.getLogger(__name__)
 
 
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the NOAA Solar services."""
+    async_setup_services(hass)
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up NOAA Solar from a config entry."""
     _LOGGER.info("Setup NOAA Space API Coordinators")
 
     api_host = entry.data[CONF_HOST]
-    api_data_interval = timedelta(seconds=entry.data[CONF_DATA_SCAN_INTERVAL])
-    api_image_interval = timedelta(seconds=entry.data[CONF_IMAGE_SCAN_INTERVAL])
 
-    api = NOAASpaceApi(api_host)
-
-    coordinators: dict[str, NOAASolarUpdateCoordinator] = {
-        "mag_field": NOAASolarMagFieldUpdateCoordinator(hass, api_data_interval, api),
-        "wind_speed": NOAASolarWindSpeedUpdateCoordinator(hass, api_data_interval, api),
-        "activity": NOAASolarActivityUpdateCoordinator(hass, api_data_interval, api),
-        "suvi_304": NOAASolarSuvi304UpdateCoordinator(hass, api_image_interval, api),
-        "lasco_c3": NOAASolarLascoC3UpdateCoordinator(hass, api_image_interval, api),
-    }
-
-    for coordinator in coordinators.values():
-        await coordinator.async_config_entry_first_refresh()
+    request_limiter = hass.data.setdefault(
+        DATA_REQUEST_LIMITER, asyncio.Semaphore(API_MAX_CONCURRENT_REQUESTS)
+    )
+    api = NOAASpaceApi(
+        api_host,
+        create_session(),
+        request_limiter,
+        response_cache_directory(hass, entry.entry_id),
+    )
+    # image jobs of all animated products share one bounded executor
+    executor = ThreadPoolExecutor(
+        max_workers=IMAGE_PIPELINE_WORKERS, thread_name_prefix=DOMAIN
+    )
+
+    # the session and executor are only cleaned up by the unload of a loaded entry
+    try:
+        coordinators = _create_coordinators(hass, entry, api, executor)
+        await asyncio.gather(
+            *(
+                coordinator.async_config_entry_warm_start()
+                for coordinator in coordinators.values()
+            )
+        )
+    except BaseException:
+        await api.async_close()
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+
+    # cancel pending image jobs once the coordinators are shut down
+    entry.async_on_unload(lambda: executor.shutdown(wait=False, cancel_futures=True))
+
+    # the response cache batches its manifest writes, the entry stays loaded on stop
+    async def _async_flush_response_cache(_: Event) -> None:
+        await api.async_flush()
+
+    entry.async_on_unload(
+        hass.bus.async_listen(EVENT_HOMEASSISTANT_STOP, _async_flush_response_cache)
+    )
 
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinators
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    # hourly time series history goes into the long-term statistics
+    if "recorder" in hass.config.components:
+        for coordinator in coordinators.values():
+            if isinstance(coordinator, NOAASolarTimeSeriesUpdateCoordinator):
+                importer = NOAASolarStatisticsImporter(hass, coordinator)
+                entry.async_on_unload(importer.async_start())
+
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
     return True
 
 
+def _create_coordinators(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    api: NOAASpaceApi,
+    executor: ThreadPoolExecutor,
+) -> dict[str, NOAASolarUpdateCoordinator]:
+    """Create the coordinators of the enabled products."""
+    enabled_products = entry.options.get(CONF_PRODUCTS, DEFAULT_PRODUCTS)
+
+    def update_interval(product: NOAASolarProductDescription) -> timedelta:
+        return timedelta(
+            seconds=entry.data.get(
+                product.conf_scan_interval, product.default_scan_interval
+            )
+        )
+
+    coordinators: dict[str, NOAASolarUpdateCoordinator] = {
+        SUMMARY_KEY: NOAASolarSummaryUpdateCoordinator(
+            hass,
+            min(update_interval(product) for product in DATA_PRODUCTS),
+            api,
+            DATA_PRODUCTS,
+        )
+    }
+    for time_series_product in TIME_SERIES_PRODUCTS:
+        if time_series_product.key in enabled_products:
+            coordinators[time_series_product.key] = (
+                NOAASolarTimeSeriesUpdateCoordinator(
+                    hass, update_interval(time_series_product), api, time_series_product
+                )
+            )
+    for animation_product in ANIMATION_PRODUCTS:
+        if animation_product.key in enabled_products:
+            coordinators[animation_product.key] = NOAASolarAnimationUpdateCoordinator(
+                hass,
+                update_interval(animation_product),
+                api,
+                animation_product,
+                executor,
+            )
+    return coordinators
+
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload a config entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     _LOGGER.info("Unload NOAA Space API Coordinators")
 
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinators: dict[str, NOAASolarUpdateCoordinator] = hass.data[DOMAIN].pop(
+            entry.entry_id
+        )
+        for api in {coordinator.api for coordinator in coordinators.values()}:
+            await api.async_close()
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove persisted data, cached responses, frames and renders of a config entry."""
+    # data products were stored per product before the summary coordinator
+    for key in (SUMMARY_KEY, *PRODUCTS):
+        store = Store(hass, STORAGE_VERSION, storage_key(entry, key))
+        await store.async_remove()
+
+    for directory in (
+        response_cache_directory(hass, entry.entry_id),
+        images_directory(hass, entry.entry_id),
+        renders_directory(hass, entry.entry_id),
+    ):
+        await hass.async_add_executor_job(
+            partial(rmtree, directory, ignore_errors=True)
+        )
+
+
 async def async_migrate_entry(hass: HomeAssistant, config_entry: ConfigEntry):
     """Migrations for config flow configuration."""
 
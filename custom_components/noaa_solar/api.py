@@ -1,51 +1,147 @@
 """API client implementations."""
 
-from typing import Any
-from cachetools import TTLCache
-from aiohttp import ClientSession
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, fields, is_dataclass
+from email.utils import parsedate_to_datetime
+from functools import partial
+import logging
+import re
+import sys
+from time import monotonic, perf_counter, time
+from typing import Any, TypeVar
+from cachetools import LRUCache
+from aiohttp import ClientResponse, ClientSession, ClientTimeout, TCPConnector, hdrs
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import STORAGE_DIR
 from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util import ssl as ssl_util
+from homeassistant.util.json import json_loads
+
+from .utils.disk_cache import DiskCache, DiskCacheEntry
+from .utils.metrics import BLOCKING_BUCKETS, Metrics
+
+from .const import (
+    API_CONNECTION_LIMIT_PER_HOST,
+    API_CONNECT_TIMEOUT,
+    API_DNS_CACHE_TTL,
+    API_KEEPALIVE_TIMEOUT,
+    API_REQUEST_TIMEOUT,
+    API_DISK_CACHE_SIZE,
+    API_MEMORY_CACHE_SIZES,
+    DEFAULT_CACHE_MAX_AGE,
+    DOMAIN,
+    IMAGE_CONTENT,
+    JSON_CONTENT,
+    JSON_EXECUTOR_MIN_SIZE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+def create_session() -> ClientSession:
+    """Create a long-lived, pooled http session for the NOAA api.
+
+    This method must be run in the event loop.
+    """
+    connector = TCPConnector(
+        ssl=ssl_util.get_default_context(),
+        limit_per_host=API_CONNECTION_LIMIT_PER_HOST,
+        ttl_dns_cache=API_DNS_CACHE_TTL,
+        keepalive_timeout=API_KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True,
+    )
+    timeout = ClientTimeout(total=API_REQUEST_TIMEOUT, connect=API_CONNECT_TIMEOUT)
+    return ClientSession(connector=connector, timeout=timeout)
+
+
+def response_cache_directory(hass: HomeAssistant, entry_id: str) -> str:
+    """Return the directory of the response disk cache of a config entry."""
+    return hass.config.path(STORAGE_DIR, DOMAIN, entry_id)
 
 
 class NOAASpaceApi:
     """NOAA API implementation."""
 
-    def __init__(self, url: str) -> None:
-        """Initialize NOAA space api."""
-        # NOAA API always returns Cache-Control max-age:60, respect it and don't load their systems
-        self.cache = TTLCache(maxsize=5, ttl=60)
-        self.url = url
+    def __init__(
+        self,
+        url: str,
+        session: ClientSession,
+        request_limiter: asyncio.Semaphore,
+        cache_directory: str | None = None,
+    ) -> None:
+        """Initialize NOAA space api.
 
-    async def fetch_solar_wind_mag_field(self) -> Any:
-        """Fetch solar wind mag data."""
-        json = await self.get_json(
-            self.url + "/products/summary/solar-wind-mag-field.json"
+        Without a cache directory responses are only cached in memory.
+        """
+        # NOAA API returns Cache-Control max-age, respect it and don't load their systems.
+        # Stale entries are kept and revalidated with a conditional request.
+        # Each content class has its own cache, so images can't evict json.
+        self.caches: dict[str, LRUCache[str, CachedResponse]] = {
+            content: LRUCache(maxsize=max_size, getsizeof=lambda cached: cached.size)
+            for content, max_size in API_MEMORY_CACHE_SIZES.items()
+        }
+        # second tier, serves cached responses across restarts
+        self.disk_cache = (
+            DiskCache(cache_directory, API_DISK_CACHE_SIZE) if cache_directory else None
         )
-        return json
+        self.url = url
+        self.session = session
+        # caps outstanding requests to NOAA, shared by all config entries
+        self.request_limiter = request_limiter
+        self._requests: dict[str, asyncio.Future[Any]] = {}
+        # cost of decoding the last json response, by url
+        self.decode_stats: dict[str, DecodeStats] = {}
+        self.metrics = Metrics()
 
-    async def fetch_solar_wind_speed(self) -> Any:
-        """Fetch solar wind speed data."""
-        json = await self.get_json(self.url + "/products/summary/solar-wind-speed.json")
-        return json
+    async def async_close(self) -> None:
+        """Write pending response cache updates and close the http session."""
+        await self.async_flush()
+        await self.session.close()
+
+    async def async_flush(self) -> None:
+        """Write pending response cache updates."""
+        await self._async_disk_job(DiskCache.flush)
 
-    async def fetch_solar_activity_10_cm_flux(self) -> Any:
-        """Fetch solar activity (10cm flux) data."""
-        json = await self.get_json(self.url + "/products/summary/10cm-flux.json")
+    async def fetch_json(
+        self, path: str, decoder: Callable[[Any], Any] | None = None
+    ) -> Any:
+        """Fetch json data of a product, optionally decoded into typed data.
+
+        The decoded data is cached, a url must always be fetched with the same
+        decoder.
+        """
+        json = await self.get_json(self.url + path, decoder)
         return json
 
-    async def fetch_suvi_primary_304_image(self) -> bytes:
-        """Fetch suvi primary 304 image."""
-        image = await self.get_image(
-            self.url + "/images/animations/suvi/primary/304/latest.png"
-        )
+    async def fetch_image(self, path: str) -> bytes:
+        """Fetch the latest image of a product."""
+        image = await self.get_image(self.url + path)
         return image
 
-    async def fetch_lasco_c3_image(self) -> bytes:
-        """Fetch lasco c3 image."""
-        image = await self.get_image(
-            self.url + "/images/animations/lasco-c3/latest.jpg"
-        )
+    async def fetch_frame_image(self, path: str) -> bytes:
+        """Fetch a single frame image of a frame listing."""
+        # frames never change, keep them out of the response cache
+        image = await self.get_image(self.url + path, cache=False)
         return image
 
+    def published(self, path: str) -> float | None:
+        """Return the publish time of the cached response of a product.
+
+        The publish time is the Last-Modified time on the local clock.
+        """
+        url = self.url + path
+        for cache in self.caches.values():
+            if (cached := cache.get(url)) is not None:
+                return cached.published
+        return None
+
     def default_json_headers(self):
         """Prepare default request headers for fetching data from noaa api."""
         return {
@@ -60,40 +156,301 @@ class NOAASpaceApi:
             "User-Agent": "Home Assistant NOAA Solar Integration",
         }
 
-    async def get_json(self, url: str) -> Any:
+    async def get_json(
+        self, url: str, decoder: Callable[[Any], Any] | None = None
+    ) -> Any:
         """HTTP request helper method."""
-        cached = self.cache.get(url)
-        if cached:
-            return cached
+        decode = partial(self._async_decode_json, url, decoder)
+        return await self._get(url, self.default_json_headers(), JSON_CONTENT, decode)
 
-        async with ClientSession() as session, session.get(
-            url,
-            headers=self.default_json_headers(),
-        ) as resp:
-            if resp.status == 200:
-                json = await resp.json()
-                self.cache[url] = json
-                return json
-
-            raise UpdateFailed(
-                f"Error retrieving data from url '{url}'. Response status code is '{resp.status}'"
+    async def get_image(self, url: str, cache: bool = True) -> bytes:
+        """HTTP request helper method."""
+        return await self._get(
+            url, self.default_image_headers(), IMAGE_CONTENT, _decode_bytes, cache
+        )
+
+    async def _get(
+        self,
+        url: str,
+        headers: dict[str, str],
+        content: str,
+        decode: Callable[[bytes], Awaitable[Any]],
+        cache: bool = True,
+    ) -> Any:
+        """Get a resource, revalidating the cached copy once it is stale.
+
+        Concurrent callers of the same url share a single in-flight request.
+        """
+        cached: CachedResponse | None = self.caches[content].get(url) if cache else None
+        if cached and cached.is_fresh():
+            self.metrics.increment("memory_hits")
+            return cached.data
+
+        request = self._requests.get(url)
+        if request is not None:
+            self.metrics.increment("shared_requests")
+        else:
+            request = asyncio.ensure_future(
+                self._request(url, headers, content, decode, cached, cache)
             )
+            self._requests[url] = request
+            request.add_done_callback(partial(self._request_done, url))
+
+        # one caller being cancelled must not cancel the request for the others
+        return await asyncio.shield(request)
+
+    def _request_done(self, url: str, request: asyncio.Future[Any]) -> None:
+        self._requests.pop(url, None)
+        # all callers may have been cancelled, e.g. a backfill on unload
+        if not request.cancelled():
+            request.exception()
+
+    async def _request(
+        self,
+        url: str,
+        headers: dict[str, str],
+        content: str,
+        decode: Callable[[bytes], Awaitable[Any]],
+        cached: CachedResponse | None,
+        cache: bool,
+    ) -> Any:
+        if cache and cached is None and self.disk_cache:
+            cached = await self._async_load_cached(url, content, decode)
+            if cached and cached.is_fresh():
+                self.metrics.increment("disk_hits")
+                return cached.data
 
-    async def get_image(self, url: str) -> bytes:
-        """HTTP request helper method."""
-        cached = self.cache.get(url)
         if cached:
-            return cached
+            headers = {**headers, **cached.validators()}
 
-        async with ClientSession() as session, session.get(
-            url,
-            headers=self.default_image_headers(),
-        ) as resp:
-            if resp.status == 200:
-                data = await resp.read()
-                self.cache[url] = data
-                return data
-
-            raise UpdateFailed(
-                f"Error retrieving data from url '{url}'. Response status code is '{resp.status}'"
+        async with self.request_limiter:
+            started = perf_counter()
+            async with self.session.get(url, headers=headers) as resp:
+                if resp.status == 304 and cached:
+                    cached.revalidate(resp)
+                    body = None
+                elif resp.status == 200:
+                    body = await resp.read()
+                else:
+                    self.metrics.increment("errors")
+                    raise UpdateFailed(
+                        f"Error retrieving data from url '{url}'. Response status code is '{resp.status}'"
+                    )
+            self.metrics.observe("request_duration", perf_counter() - started)
+
+        # decoding and caching don't hold on to a request slot
+        if body is None:
+            self.metrics.increment("revalidated")
+            await self._async_disk_job(
+                DiskCache.update,
+                url,
+                cached.etag,
+                cached.last_modified,
+                cached.expires_at(),
+            )
+            return cached.data
+
+        self.metrics.increment("downloads")
+        self.metrics.increment(f"{content}_bytes_downloaded", len(body))
+        data = await decode(body)
+        if cache:
+            cached = CachedResponse(data, len(body), resp)
+            self._cache(content, url, cached)
+            await self._async_disk_job(
+                DiskCache.put,
+                url,
+                body,
+                cached.etag,
+                cached.last_modified,
+                cached.expires_at(),
+            )
+        return data
+
+    async def _async_load_cached(
+        self, url: str, content: str, decode: Callable[[bytes], Awaitable[Any]]
+    ) -> CachedResponse | None:
+        """Load a response cached on disk into the memory cache."""
+        if not (result := await self._async_disk_job(DiskCache.get, url)):
+            return None
+
+        entry, body = result
+        try:
+            data = await decode(body)
+        except ValueError as err:
+            _LOGGER.debug("Ignoring undecodable cached response of %s: %s", url, err)
+            return None
+
+        cached = CachedResponse.from_disk(data, entry)
+        self._cache(content, url, cached)
+        return cached
+
+    def _cache(self, content: str, url: str, cached: CachedResponse) -> None:
+        """Cache a response in memory, unless it is larger than the whole cache."""
+        cache = self.caches[content]
+        if cached.size <= cache.maxsize:
+            cache[url] = cached
+
+    async def _async_disk_job(self, target: Callable[..., _T], *args: Any) -> _T | None:
+        """Run a disk cache job in the executor, disk errors only lose the cache."""
+        if not self.disk_cache:
+            return None
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, target, self.disk_cache, *args
             )
+        except OSError as err:
+            _LOGGER.warning("Unable to access the response cache: %s", err)
+            return None
+
+    async def _async_decode_json(
+        self, url: str, decoder: Callable[[Any], Any] | None, body: bytes
+    ) -> Any:
+        # large tables are decoded off the event loop
+        if len(body) < JSON_EXECUTOR_MIN_SIZE:
+            data, stats = _decode_json(body, decoder)
+            self.metrics.observe("loop_blocking", stats.duration, BLOCKING_BUCKETS)
+        else:
+            data, stats = await asyncio.get_running_loop().run_in_executor(
+                None, _decode_json, body, decoder
+            )
+
+        self.decode_stats[url] = stats
+        _LOGGER.debug(
+            "Decoded %s bytes of %s in %.1f ms, retaining %s bytes",
+            stats.size,
+            url,
+            stats.duration * 1000,
+            stats.memory,
+        )
+        return data
+
+
+@dataclass(slots=True)
+class DecodeStats:
+    """Cost of decoding a json response."""
+
+    size: int
+    # seconds
+    duration: float
+    # estimated bytes retained by the decoded data
+    memory: int
+
+
+class CachedResponse:
+    """Cached NOAA api response with its cache validators."""
+
+    def __init__(self, data: Any, size: int, resp: ClientResponse | None) -> None:
+        """Initialize the cached response.
+
+        The size is the size of the response body.
+        """
+        self.data = data
+        self.size = size
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        self.published: float | None = None
+        self.expires = monotonic()
+        if resp is not None:
+            self.revalidate(resp)
+
+    @classmethod
+    def from_disk(cls, data: Any, entry: DiskCacheEntry) -> CachedResponse:
+        """Create a cached response from a disk cache entry."""
+        cached = cls(data, entry.size, None)
+        cached.etag = entry.etag
+        cached.last_modified = entry.last_modified
+        cached.published = _parse_http_date(entry.last_modified)
+        cached.expires = monotonic() + entry.expires - time()
+        return cached
+
+    def expires_at(self) -> float:
+        """Return the wall clock expiry time."""
+        return time() + self.expires - monotonic()
+
+    def is_fresh(self) -> bool:
+        """Return whether the response can be served without revalidation."""
+        return monotonic() < self.expires
+
+    def validators(self) -> dict[str, str]:
+        """Prepare conditional request headers for revalidation."""
+        headers = {}
+        if self.etag:
+            headers[hdrs.IF_NONE_MATCH] = self.etag
+        if self.last_modified:
+            headers[hdrs.IF_MODIFIED_SINCE] = self.last_modified
+        return headers
+
+    def revalidate(self, resp: ClientResponse) -> None:
+        """Refresh the validators and expiry from a response."""
+        self.etag = resp.headers.get(hdrs.ETAG, self.etag)
+        self.last_modified = resp.headers.get(hdrs.LAST_MODIFIED, self.last_modified)
+        self.expires = _get_expires(resp)
+
+        if (last_modified := _parse_http_date(self.last_modified)) is not None:
+            # correct for the clock offset between NOAA and us
+            now = time()
+            server_now = _parse_http_date(resp.headers.get(hdrs.DATE)) or now
+            self.published = last_modified - server_now + now
+
+
+def _decode_json(
+    body: bytes, decoder: Callable[[Any], Any] | None
+) -> tuple[Any, DecodeStats]:
+    start = perf_counter()
+    data = json_loads(body)
+    if decoder:
+        data = decoder(data)
+    duration = perf_counter() - start
+    return data, DecodeStats(len(body), duration, _retained_size(data))
+
+
+def _retained_size(data: Any, seen: set[int] | None = None) -> int:
+    """Estimate the bytes held by decoded data, counting shared objects once.
+
+    Decoded data is made of containers, dataclasses and scalars, typed arrays
+    hold their buffer.
+    """
+    seen = set() if seen is None else seen
+    if id(data) in seen:
+        return 0
+    seen.add(id(data))
+
+    size = sys.getsizeof(data)
+    if isinstance(data, dict):
+        items = [*data.keys(), *data.values()]
+    elif isinstance(data, list | tuple):
+        items = data
+    elif is_dataclass(data):
+        items = [getattr(data, field.name) for field in fields(data)]
+    else:
+        return size
+    return size + sum(_retained_size(item, seen) for item in items)
+
+
+async def _decode_bytes(body: bytes) -> bytes:
+    return body
+
+
+def _parse_http_date(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _get_expires(resp: ClientResponse) -> float:
+    cache_control = resp.headers.get(hdrs.CACHE_CONTROL, "")
+    if "no-cache" in cache_control or "no-store" in cache_control:
+        return monotonic()
+
+    max_age = DEFAULT_CACHE_MAX_AGE
+    if match := _MAX_AGE_RE.search(cache_control):
+        max_age = int(match.group(1))
+
+    if age := resp.headers.get(hdrs.AGE, "").strip():
+        if age.isdigit():
+            max_age -= int(age)
+
+    return monotonic() + max(max_age, 0)
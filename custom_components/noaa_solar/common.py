@@ -2,7 +2,25 @@
 
 from os.path import join, dirname
 
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import STORAGE_DIR
+
+from .const import DOMAIN
+
 INTEGRATION_DATA_DIRECTORY = join(dirname(__file__), "data")
-IMAGES_DIRECTORY = join(INTEGRATION_DATA_DIRECTORY, "images")
-SUVI_304_IMAGES_DIRECTORY = join(IMAGES_DIRECTORY, "suvi_304")
-LASCO_C3_IMAGES_DIRECTORY = join(IMAGES_DIRECTORY, "lasco_c3")
+# frames were stored in the integration, which is replaced by its updates
+LEGACY_IMAGES_DIRECTORY = join(INTEGRATION_DATA_DIRECTORY, "images")
+
+
+def images_directory(hass: HomeAssistant, entry_id: str) -> str:
+    """Return the directory of the frame archives and animations of a config entry."""
+    return hass.config.path(STORAGE_DIR, DOMAIN, "images", entry_id)
+
+
+def renders_directory(hass: HomeAssistant, entry_id: str) -> str:
+    """Return the directory of rendered animations of a config entry.
+
+    It is outside of the storage directory, so it can be allowed as source of
+    notification attachments.
+    """
+    return hass.config.path(DOMAIN, "renders", entry_id)
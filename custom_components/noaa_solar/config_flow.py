@@ -6,7 +6,9 @@ import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_HOST
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
+import homeassistant.helpers.config_validation as cv
 
 from .const import (
     DEFAULT_DATA_SCAN_INTERVAL,
@@ -15,8 +17,19 @@ from .const import (
     DEFAULT_HOST,
     DOMAIN,
     CONF_DATA_SCAN_INTERVAL,
+    CONF_DIAGNOSTIC_SENSORS,
     CONF_IMAGE_SCAN_INTERVAL,
+    CONF_FRAME_DEDUP,
+    CONF_FRAME_DEDUP_DISTANCE,
+    CONF_PRODUCTS,
+    CONF_STATISTICS_WINDOWS,
+    DEFAULT_FRAME_DEDUP_DISTANCE,
+    DEFAULT_STATISTICS_WINDOWS,
+    ENCODINGS,
+    MAX_FRAME_DEDUP_DISTANCE,
+    STATISTICS_WINDOWS,
 )
+from .products import ANIMATION_PRODUCTS, DEFAULT_PRODUCTS, OPTIONAL_PRODUCTS
 
 
 def data_schema(user_input: dict[str, Any]) -> vol.Schema:
@@ -42,6 +55,59 @@ def data_schema(user_input: dict[str, Any]) -> vol.Schema:
     )
 
 
+def products_schema(options: dict[str, Any]) -> vol.Schema:
+    """Prepare the optional products options schema."""
+    return vol.Schema(
+        {
+            vol.Required(
+                CONF_PRODUCTS,
+                default=options.get(CONF_PRODUCTS, DEFAULT_PRODUCTS),
+            ): cv.multi_select(
+                {product.key: product.name for product in OPTIONAL_PRODUCTS}
+            ),
+            vol.Required(
+                CONF_STATISTICS_WINDOWS,
+                default=options.get(
+                    CONF_STATISTICS_WINDOWS, DEFAULT_STATISTICS_WINDOWS
+                ),
+            ): cv.multi_select(list(STATISTICS_WINDOWS)),
+            vol.Required(
+                CONF_DIAGNOSTIC_SENSORS,
+                default=options.get(CONF_DIAGNOSTIC_SENSORS, False),
+            ): bool,
+        }
+    )
+
+
+def animations_schema(options: dict[str, Any], products: list[str]) -> vol.Schema:
+    """Prepare the animation options schema, empty without animated products."""
+    encodings = {
+        vol.Required(
+            product.conf_encoding,
+            default=options.get(product.conf_encoding, product.default_encoding),
+        ): vol.In(ENCODINGS)
+        for product in ANIMATION_PRODUCTS
+        if product.key in products
+    }
+    if not encodings:
+        return vol.Schema({})
+
+    return vol.Schema(
+        {
+            **encodings,
+            vol.Required(
+                CONF_FRAME_DEDUP, default=options.get(CONF_FRAME_DEDUP, False)
+            ): bool,
+            vol.Required(
+                CONF_FRAME_DEDUP_DISTANCE,
+                default=options.get(
+                    CONF_FRAME_DEDUP_DISTANCE, DEFAULT_FRAME_DEDUP_DISTANCE
+                ),
+            ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_FRAME_DEDUP_DISTANCE)),
+        }
+    )
+
+
 def default_user_input() -> dict[str, Any]:
     """Prepare default user input."""
     user_input = {}
@@ -96,3 +162,45 @@ class NOAASolarConfigFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
             data_schema=data_schema(user_input),
             errors=self._errors,
         )
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> config_entries.OptionsFlow:
+        """Get the options flow for this handler."""
+        return NOAASolarOptionsFlowHandler(config_entry)
+
+
+class NOAASolarOptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle options flow for NOAA Solar integration."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize the options flow."""
+        self.config_entry = config_entry
+        self._options: dict[str, Any] = dict(config_entry.options)
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Show animated products Form step."""
+        if user_input is not None:
+            self._options.update(user_input)
+            return await self.async_step_animations()
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=products_schema(self._options),
+        )
+
+    async def async_step_animations(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Show animation options Form step."""
+        schema = animations_schema(self._options, self._options[CONF_PRODUCTS])
+        # no animated product enabled
+        if user_input is not None or not schema.schema:
+            self._options.update(user_input or {})
+            return self.async_create_entry(title="", data=self._options)
+
+        return self.async_show_form(step_id="animations", data_schema=schema)
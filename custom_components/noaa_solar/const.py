@@ -4,6 +4,8 @@ from typing import Final
 
 
 DOMAIN = "noaa_solar"
+DATA_REQUEST_LIMITER = f"{DOMAIN}_request_limiter"
+SUMMARY_KEY = "summary"
 
 # Default config for solar system scraper.
 DEFAULT_HOST = "https://services.swpc.noaa.gov/"
@@ -14,3 +16,65 @@ DEFAULT_IMAGE_SCAN_INTERVAL = 3600  # seconds
 # Configuration defaults
 CONF_DATA_SCAN_INTERVAL: Final = "data_scan_interval"
 CONF_IMAGE_SCAN_INTERVAL: Final = "image_scan_interval"
+CONF_PRODUCTS: Final = "products"
+CONF_STATISTICS_WINDOWS: Final = "statistics_windows"
+CONF_FRAME_DEDUP: Final = "frame_dedup"
+CONF_FRAME_DEDUP_DISTANCE: Final = "frame_dedup_distance"
+CONF_DIAGNOSTIC_SENSORS: Final = "diagnostic_sensors"
+
+# Animation encodings, see utils.gif_utils.ANIMATION_ENCODERS.
+ENCODINGS: Final = ["gif", "webp", "apng"]
+DEFAULT_ENCODING: Final = "gif"
+# Bits of the 64 bit perceptual hash two frames may differ in to count as one.
+DEFAULT_FRAME_DEDUP_DISTANCE: Final = 4
+MAX_FRAME_DEDUP_DISTANCE: Final = 16
+
+# Time series settings.
+TIME_SERIES_CAPACITY = 7 * 24 * 60 + 60  # rows, a week of minute data
+# Statistics windows of time series sensors, in seconds.
+STATISTICS_WINDOWS: Final = {
+    "1h": 60 * 60,
+    "6h": 6 * 60 * 60,
+    "24h": 24 * 60 * 60,
+    "7d": 7 * 24 * 60 * 60,
+}
+DEFAULT_STATISTICS_WINDOWS: Final = ["1h", "24h"]
+
+# HTTP client settings for the NOAA api.
+API_CONNECTION_LIMIT_PER_HOST = 4
+API_DNS_CACHE_TTL = 300  # seconds
+API_KEEPALIVE_TIMEOUT = 75  # seconds
+API_CONNECT_TIMEOUT = 10  # seconds
+API_REQUEST_TIMEOUT = 60  # seconds
+API_MAX_CONCURRENT_REQUESTS = 4
+DEFAULT_CACHE_MAX_AGE = 60  # seconds, used when NOAA sends no max-age
+JSON_EXECUTOR_MIN_SIZE = 64 * 1024  # bytes, larger json is decoded in the executor
+
+# Response cache settings, sizes are bytes of response bodies.
+JSON_CONTENT = "json"
+IMAGE_CONTENT = "image"
+API_MEMORY_CACHE_SIZES = {
+    JSON_CONTENT: 8 * 1024 * 1024,
+    IMAGE_CONTENT: 16 * 1024 * 1024,
+}
+API_DISK_CACHE_SIZE = 64 * 1024 * 1024
+
+# Image pipeline settings.
+IMAGE_PIPELINE_WORKERS = 2  # executor threads shared by all animated products
+BACKFILL_CONCURRENCY = 4  # parallel frame downloads per animated product
+ANIMATION_FILE_NAME = "animation"
+RENDER_CACHE_SIZE = 32 * 1024 * 1024  # bytes of rendered animations per product
+
+# Animation renditions, by the maximum edge length of their frames in pixels.
+FULL_RENDITION: Final = "full"
+RENDITIONS: Final[dict[str, int | None]] = {
+    FULL_RENDITION: None,  # source resolution
+    "dashboard": 512,
+    "thumbnail": 128,
+}
+
+# Persisted coordinator data.
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 30  # seconds
+# time series ring buffers are large and change every poll
+TIME_SERIES_SAVE_DELAY = 15 * 60  # seconds
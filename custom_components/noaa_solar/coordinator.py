@@ -1,121 +1,823 @@
 """The NOAA Solar integration."""
 from __future__ import annotations
+import asyncio
 from abc import abstractmethod
-from datetime import timedelta, datetime
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from hashlib import sha1
+import json
 import logging
+from os.path import basename, getsize, join, splitext
+from threading import Lock
+from time import perf_counter, time
+from typing import Any, BinaryIO, TypeVar
 
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from aiohttp import ClientError
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
 from .api import NOAASpaceApi
-from .utils.gif_utils import save_png_gif_frame, create_gif, Gif
-from .common import SUVI_304_IMAGES_DIRECTORY, LASCO_C3_IMAGES_DIRECTORY
-
-from .const import DOMAIN
+from .utils.decoders import (
+    FrameListingEntry,
+    TimeSeriesTable,
+    decode_frame_listing,
+    time_series_table_decoder,
+)
+from .utils.frame_archive import as_utc
+from .utils.frame_store import FrameStore, GifFrameRef
+from .utils.metrics import BLOCKING_BUCKETS, Metrics
+from .utils.profiling import ProfileReport, profile
+from .utils.render_cache import RenderCache, RenderedAnimation
+from .utils.scheduler import AdaptiveSchedule
+from .utils.gif_utils import ANIMATION_ENCODERS, FRAME_SIDECARS, Animation
+from .utils.time_series import TimeSeries
+from .products import (
+    NOAASolarAnimationProductDescription,
+    NOAASolarDataProductDescription,
+    NOAASolarTimeSeriesProductDescription,
+)
+
+from .const import (
+    CONF_FRAME_DEDUP,
+    CONF_FRAME_DEDUP_DISTANCE,
+    CONF_STATISTICS_WINDOWS,
+    DEFAULT_FRAME_DEDUP_DISTANCE,
+    DEFAULT_STATISTICS_WINDOWS,
+    DOMAIN,
+    STATISTICS_WINDOWS,
+    RENDER_CACHE_SIZE,
+    RENDITIONS,
+    SUMMARY_KEY,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+    TIME_SERIES_SAVE_DELAY,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+_T = TypeVar("_T")
+
+
+def storage_key(entry: ConfigEntry, key: str) -> str:
+    """Return the storage key for persisted coordinator data of an entry."""
+    return f"{DOMAIN}.{entry.entry_id}.{key}"
+
 
 class NOAASolarUpdateCoordinator(DataUpdateCoordinator):
-    """Update handler."""
+    """Update handler.
+
+    The last good data is persisted, so that entities can come up from disk
+    while fresh data is fetched in the background. The update interval is
+    adapted after every poll to the publish cadence of the product.
+    """
 
     def __init__(
-        self, hass: HomeAssistant, update_interval: timedelta, api: NOAASpaceApi
+        self,
+        hass: HomeAssistant,
+        update_interval: timedelta,
+        api: NOAASpaceApi,
+        key: str,
     ) -> None:
         """Initialize global data updater."""
         self.api = api
-
-        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=update_interval)
+        self.storage_key = key
+        # the configured interval, the update interval follows the schedule
+        self.scan_interval = update_interval
+        self._schedule = AdaptiveSchedule(update_interval.total_seconds())
+        self.metrics = Metrics()
+
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {key}",
+            update_interval=update_interval,
+        )
+
+        self._store: Store = Store(
+            hass, STORAGE_VERSION, storage_key(self.config_entry, key)
+        )
+
+    async def async_config_entry_warm_start(self) -> None:
+        """Restore the last good data and refresh it in the background.
+
+        Falls back to a regular first refresh when there is no stored data.
+        """
+        if (stored := await self._store.async_load()) is not None:
+            try:
+                data = await self._async_restore_data(stored)
+            except (OSError, ValueError, KeyError, TypeError) as err:
+                _LOGGER.warning("Unable to restore %s data: %s", self.storage_key, err)
+                data = None
+
+            if data is not None:
+                self.data = data
+                self.config_entry.async_create_background_task(
+                    self.hass,
+                    self.async_refresh(),
+                    f"{DOMAIN} {self.storage_key} refresh",
+                )
+                return
+
+        await self.async_config_entry_first_refresh()
+
+    @property
+    def title(self) -> str:
+        """Return the name of the coordinated data."""
+        return self.storage_key
 
     async def _async_update_data(self):
         """Get the latest data from NOAA."""
-        return await self._fetch_data()
+        started = perf_counter()
+        try:
+            data = await self._fetch_data()
+        except Exception:
+            self.metrics.increment("failures")
+            # failed polls are retried at the configured interval
+            self.update_interval = self.scan_interval
+            raise
+        self.metrics.observe("fetch_duration", perf_counter() - started)
+
+        changed = self._data_changed(data)
+        self.metrics.increment("updates")
+        self.metrics.increment("changes" if changed else "unchanged")
+
+        self._async_schedule_save(data)
+        self._reschedule(changed)
+        return data
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all listeners, measuring how long they block the event loop."""
+        started = perf_counter()
+        self._async_notify_listeners()
+        self.metrics.observe(
+            "loop_blocking", perf_counter() - started, BLOCKING_BUCKETS
+        )
+
+    @callback
+    def _async_notify_listeners(self) -> None:
+        """Update the listeners."""
+        super().async_update_listeners()
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return diagnostics of the coordinator."""
+        last_exception = self.last_exception
+        update_interval = self.update_interval or self.scan_interval
+        return {
+            "last_update_success": self.last_update_success,
+            "last_exception": repr(last_exception) if last_exception else None,
+            "scan_interval": self.scan_interval.total_seconds(),
+            "update_interval": update_interval.total_seconds(),
+            "cadence": self._schedule.cadence,
+            "metrics": self.metrics.as_dict(),
+        }
+
+    def _reschedule(self, changed: bool) -> None:
+        """Set the update interval from the result of a poll."""
+        published = [
+            timestamp
+            for endpoint in self._published_endpoints()
+            if (timestamp := self.api.published(endpoint)) is not None
+        ]
+        delay = self._schedule.next_delay(time(), changed, max(published, default=None))
+        self.update_interval = timedelta(seconds=delay)
+        _LOGGER.debug(
+            "Next %s poll in %.0f s, cadence %s s",
+            self.storage_key,
+            delay,
+            self._schedule.cadence,
+        )
 
     @abstractmethod
     async def _fetch_data(self):
         """Fetch the actual data."""
         raise NotImplementedError
 
+    def _data_changed(self, data: Any) -> bool:
+        """Return whether a poll brought new data."""
+        return data is not self.data and data != self.data
 
-class NOAASolarMagFieldUpdateCoordinator(NOAASolarUpdateCoordinator):
-    """Update handler."""
+    def _published_endpoints(self) -> list[str]:
+        """Return the endpoints whose publish times drive the schedule."""
+        return []
 
-    async def _fetch_data(self):
-        """Fetch new data."""
-        return await self.api.fetch_solar_wind_mag_field()
+    @callback
+    def _async_schedule_save(self, data: Any) -> None:
+        """Persist data once the polls settled."""
+        self._store.async_delay_save(
+            lambda: self._data_to_store(data), STORAGE_SAVE_DELAY
+        )
 
+    def _data_to_store(self, data: Any) -> Any:
+        """Prepare data to be persisted."""
+        return data
 
-class NOAASolarWindSpeedUpdateCoordinator(NOAASolarUpdateCoordinator):
-    """Update handler."""
+    async def _async_restore_data(self, stored: Any) -> Any:
+        """Restore data from its persisted form."""
+        return stored
 
-    async def _fetch_data(self):
-        """Fetch new data."""
-        return await self.api.fetch_solar_wind_speed()
 
+class NOAASolarSummaryUpdateCoordinator(NOAASolarUpdateCoordinator):
+    """Update handler for all json summary products.
 
-class NOAASolarActivityUpdateCoordinator(NOAASolarUpdateCoordinator):
-    """Update handler."""
+    The products are fetched concurrently in one tick and published as a single
+    snapshot, keyed by product. Entities listen with their product key as
+    context and are only updated when the data of their product changed.
+    Listeners without a context, like the diagnostic sensors, are updated on
+    every refresh.
+    """
 
-    async def _fetch_data(self):
-        """Fetch new data."""
-        return await self.api.fetch_solar_activity_10_cm_flux()
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        update_interval: timedelta,
+        api: NOAASpaceApi,
+        products: tuple[NOAASolarDataProductDescription, ...],
+    ) -> None:
+        """Initialize summary data updater."""
+        self.products = products
+        self._changed: set[str] = set()
+        self._listeners_available = True
+        # state writes skipped by entities because nothing changed, by product
+        self.skipped_writes: Counter[str] = Counter()
+
+        super().__init__(hass, update_interval, api, SUMMARY_KEY)
+
+    async def _fetch_data(self) -> dict[str, Any]:
+        """Fetch new data of all products."""
+        previous: dict[str, Any] = self.data or {}
+        results = await asyncio.gather(
+            *(self.api.fetch_json(product.endpoint) for product in self.products),
+            return_exceptions=True,
+        )
+
+        data = {}
+        for product, result in zip(self.products, results):
+            if not isinstance(result, BaseException):
+                data[product.key] = result
+                continue
+            # a single failing product keeps its last good data
+            if not isinstance(result, Exception) or product.key not in previous:
+                raise result
+            _LOGGER.warning("Unable to update %s data: %s", product.key, result)
+            data[product.key] = previous[product.key]
+
+        self._changed = {key for key in data if data[key] != previous.get(key)}
+        return data
+
+    def _data_changed(self, data: dict[str, Any]) -> bool:
+        """Return whether the data of any product changed."""
+        return bool(self._changed)
+
+    def _published_endpoints(self) -> list[str]:
+        """Return the endpoints of all products."""
+        return [product.endpoint for product in self.products]
+
+    async def _async_restore_data(self, stored: Any) -> dict[str, Any] | None:
+        """Restore the last snapshot, if it holds all products."""
+        if stored.keys() != {product.key for product in self.products}:
+            return None
+        return stored
+
+    @property
+    def title(self) -> str:
+        """Return the name of the coordinated data."""
+        return "Summary"
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return diagnostics of the coordinator."""
+        return {**super().diagnostics(), "skipped_writes": dict(self.skipped_writes)}
+
+    @callback
+    def _async_notify_listeners(self) -> None:
+        """Update the listeners of the products that changed.
+
+        All listeners are updated when the availability of the data changed.
+        """
+        update_all = self.last_update_success != self._listeners_available
+        self._listeners_available = self.last_update_success
+        changed, self._changed = self._changed, set()
+
+        for update_callback, context in list(self._listeners.values()):
+            if update_all or context is None or context in changed:
+                update_callback()
+
+
+class NOAASolarTimeSeriesUpdateCoordinator(NOAASolarUpdateCoordinator):
+    """Update handler for time series products.
+
+    Rows are kept in a ring buffer, each poll only merges the rows newer than
+    the newest stored row. The data is a snapshot of the newest value and the
+    statistics windows of every column.
+    """
 
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        update_interval: timedelta,
+        api: NOAASpaceApi,
+        product: NOAASolarTimeSeriesProductDescription,
+    ) -> None:
+        """Initialize time series data updater."""
+        self.product = product
+        self.series = TimeSeries(
+            [column.key for column in product.columns], product.capacity
+        )
+        # cached tables only hold the rows that were new when they were decoded,
+        # the merge skips rows it already has either way
+        self._decoder = time_series_table_decoder(
+            self.series.columns, lambda: self.series.last_time
+        )
+        self._endpoint = product.endpoint
+        self._new_rows = 0
+        self._save_pending = False
+        # merges and readers of the ring buffer run in different executor threads
+        self._series_lock = Lock()
+
+        super().__init__(hass, update_interval, api, product.key)
+
+        self.windows = {
+            window: STATISTICS_WINDOWS[window]
+            for window in self.config_entry.options.get(
+                CONF_STATISTICS_WINDOWS, DEFAULT_STATISTICS_WINDOWS
+            )
+        }
+
+    async def async_shutdown(self) -> None:
+        """Cancel refreshes and write pending rows."""
+        await super().async_shutdown()
+        if self._save_pending:
+            await self._store.async_save(self._ring_buffer_to_store())
+
+    async def _fetch_data(self) -> dict[str, Any]:
+        """Fetch and merge new rows."""
+        endpoint = self.product.endpoint
+        last_time = self.series.last_time
+        # the polled period doesn't reach back to the stored rows
+        if last_time is None or last_time < time() - self.product.endpoint_period:
+            endpoint = self.product.backfill_endpoint
+        self._endpoint = endpoint
+
+        table = await self.api.fetch_json(endpoint, self._decoder)
+        return await self.hass.async_add_executor_job(self._merge, table)
+
+    def hourly(
+        self, column: str, since: float, until: float
+    ) -> list[tuple[float, float, float, float]]:
+        """Return the complete hours of a column, serialized with merges.
+
+        Runs in the executor.
+        """
+        with self._series_lock:
+            return self.series.hourly(column, since, until)
+
+    def _merge(self, table: TimeSeriesTable) -> dict[str, Any]:
+        """Merge rows and compute the snapshot."""
+        with self._series_lock:
+            self._new_rows = self.series.merge(table)
+            _LOGGER.debug("Merged %s new %s rows", self._new_rows, self.storage_key)
+            return self._snapshot()
+
+    @property
+    def title(self) -> str:
+        """Return the name of the coordinated data."""
+        return self.product.name
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return diagnostics of the coordinator."""
+        return {**super().diagnostics(), "rows": len(self.series)}
+
+    def _data_changed(self, data: dict[str, Any]) -> bool:
+        """Return whether new rows were merged."""
+        return self._new_rows > 0
+
+    def _published_endpoints(self) -> list[str]:
+        """Return the last fetched endpoint."""
+        return [self._endpoint]
+
+    def _snapshot(self) -> dict[str, Any]:
+        """Compute the newest value and statistics of every column."""
+        now = time()
+        return {
+            column: {
+                "value": self.series.latest(column),
+                "statistics": {
+                    window: self.series.stats(column, now - seconds)
+                    for window, seconds in self.windows.items()
+                },
+            }
+            for column in self.series.columns
+        }
+
+    @callback
+    def _async_schedule_save(self, data: dict[str, Any]) -> None:
+        """Persist the ring buffer at most every TIME_SERIES_SAVE_DELAY.
+
+        A pending save isn't postponed by later polls, it writes the rows
+        merged until then. Rows still pending are written on unload, and by the
+        store when Home Assistant stops.
+        """
+        if not self._save_pending:
+            self._save_pending = True
+            self._store.async_delay_save(
+                self._ring_buffer_to_store, TIME_SERIES_SAVE_DELAY
+            )
+
+    @callback
+    def _ring_buffer_to_store(self) -> Any:
+        self._save_pending = False
+        return self._data_to_store(self.data)
+
+    def _data_to_store(self, data: dict[str, Any]) -> Any:
+        """Prepare the ring buffer to be persisted."""
+        return self.series.as_dict()
+
+    async def _async_restore_data(self, stored: Any) -> dict[str, Any] | None:
+        """Restore the ring buffer."""
+        if stored["columns"] != list(self.series.columns):
+            return None
+
+        self.series = await self.hass.async_add_executor_job(
+            TimeSeries.from_dict, stored, self.product.capacity
+        )
+        return await self.hass.async_add_executor_job(self._snapshot)
+
+
+class NOAASolarAnimationUpdateCoordinator(NOAASolarUpdateCoordinator):
+    """Update handler for animated images.
+
+    The frame archive and animation encoding are handled by an executor shared
+    by all animated products, so that decoding and quantizing frames does not
+    block the event loop. Each product runs at most one image job at a time, so
+    adding products does not let a single product take over the executor.
+    """
+
+    product: NOAASolarAnimationProductDescription
 
-class NOAASolarSuvi304UpdateCoordinator(NOAASolarUpdateCoordinator):
-    """Update handler."""
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        update_interval: timedelta,
+        api: NOAASpaceApi,
+        product: NOAASolarAnimationProductDescription,
+        executor: ThreadPoolExecutor,
+    ) -> None:
+        """Initialize image data updater."""
+        self._last_image: bytes | None = None
+        self._backfill_done = False
+        self._executor = executor
+        # the frame store is not thread safe, image jobs must not overlap
+        self._job_lock = asyncio.Lock()
+
+        self.product = product
+        super().__init__(hass, update_interval, api, product.key)
+
+        options = self.config_entry.options
+        dedup_distance = None
+        if options.get(CONF_FRAME_DEDUP, False):
+            dedup_distance = options.get(
+                CONF_FRAME_DEDUP_DISTANCE, DEFAULT_FRAME_DEDUP_DISTANCE
+            )
+        self._frame_store = FrameStore(
+            product.image_directory(hass, self.config_entry.entry_id),
+            max_frames=product.max_frames,
+            sidecars=FRAME_SIDECARS,
+            dedup_distance=dedup_distance,
+            import_directory=product.legacy_image_directory,
+        )
+
+        encoding = options.get(product.conf_encoding, product.default_encoding)
+        self.encoder = ANIMATION_ENCODERS[encoding]()
+        self.render_cache = RenderCache(
+            product.render_directory(hass, self.config_entry.entry_id),
+            RENDER_CACHE_SIZE,
+        )
+
+    @property
+    def image_directory(self) -> str:
+        """Return the directory of the frame archive and animations."""
+        return self.product.image_directory(self.hass, self.config_entry.entry_id)
+
+    async def async_shutdown(self) -> None:
+        """Cancel refreshes and close the frame archive."""
+        await super().async_shutdown()
+        # the image executor may already be shut down, closing doesn't block
+        async with self._job_lock:
+            self._frame_store.close()
+
+    async def async_profile_rebuild(self) -> ProfileReport:
+        """Save the latest image and rebuild the animation under the profiler.
+
+        Only the image job is profiled, the image is fetched beforehand. The
+        rebuilt animation is published like a regular update.
+        """
+        image = await self._fetch_image()
+        animations, report = await self._async_add_image_job(
+            profile, self._save_and_build, image
+        )
+        self._last_image = image
+
+        self._async_publish(animations)
+        return report
+
+    async def async_render(
+        self,
+        start: datetime | None,
+        end: datetime | None,
+        step: int,
+        max_size: int | None,
+        duration: int,
+    ) -> tuple[RenderedAnimation, bool]:
+        """Render an animation of the stored frames of a time window.
+
+        Every step-th frame is shown, counting back from the newest frame of
+        the window. Returns the render and whether it was cached. Raises
+        ValueError when the window holds no frames.
+        """
+        return await self._async_add_image_job(
+            self._render, start, end, step, max_size, duration
+        )
 
     async def _fetch_data(self):
         """Fetch new data."""
-        current_gif: Gif = self.data
-        image = await self.api.fetch_suvi_primary_304_image()
-        gif_frame = save_png_gif_frame(image, SUVI_304_IMAGES_DIRECTORY)
+        current_animation: dict[str, Animation] = self.data
 
-        # nothing new, return created state
-        if current_gif and not gif_frame.saved:
-            return current_gif
-
-        # handle case where gif was not yet created
-        if not current_gif:
-            gif_data = create_gif(SUVI_304_IMAGES_DIRECTORY)
-            gif = Gif(gif_data, gif_frame.file_datetime)
-            return gif
-
-        # check if a gif update is due
-        # (this is for perf reasons, no need to create a >10MB gif every 2 minutes..)
-        next_update_datetime = current_gif.created + timedelta(hours=12)
-        if datetime.now() > next_update_datetime:
-            gif_data = create_gif(SUVI_304_IMAGES_DIRECTORY)
-            gif = Gif(gif_data, gif_frame.file_datetime)
-            return gif
+        image = await self._fetch_image()
 
-        return current_gif
+        # the api serves the cached image while NOAA reports it as not modified
+        if current_animation and image == self._last_image:
+            return current_animation
+        self._last_image = image
 
+        frame = await self._async_add_image_job(self._frame_store.save, image)
 
-class NOAASolarLascoC3UpdateCoordinator(NOAASolarUpdateCoordinator):
-    """Update handler."""
-
-    async def _fetch_data(self):
-        """Fetch new data."""
-        current_gif: Gif = self.data
-        image = await self.api.fetch_lasco_c3_image()
-        gif_frame = save_png_gif_frame(image, LASCO_C3_IMAGES_DIRECTORY)
+        # fill up the animation from NOAA's frame listing once per setup, in the
+        # background so that the setup only waits for the latest image
+        if not self._backfill_done:
+            self._backfill_done = True
+            self.config_entry.async_create_background_task(
+                self.hass,
+                self._async_backfill_animation(),
+                f"{DOMAIN} {self.storage_key} backfill",
+            )
 
         # nothing new, return created state
-        if current_gif and not gif_frame.saved:
-            return current_gif
-
-        # handle case where gif was not yet created
-        if not current_gif:
-            gif_data = create_gif(LASCO_C3_IMAGES_DIRECTORY)
-            gif = Gif(gif_data, gif_frame.file_datetime)
-            return gif
-
-        # check if a gif update is due
-        # (this is for perf reasons, no need to create a >10MB gif every 2 minutes..)
-        next_update_datetime = current_gif.created + timedelta(hours=12)
-        if datetime.now() > next_update_datetime:
-            gif_data = create_gif(LASCO_C3_IMAGES_DIRECTORY)
-            gif = Gif(gif_data, gif_frame.file_datetime)
-            return gif
-
-        return current_gif
+        if current_animation and not frame.saved:
+            return current_animation
+
+        # only new frames get encoded, cached frames are spliced in
+        animations = await self._async_add_image_job(self._build_animation)
+        return animations
+
+    @property
+    def title(self) -> str:
+        """Return the name of the coordinated data."""
+        return self.product.name
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return diagnostics of the coordinator."""
+        return {
+            **super().diagnostics(),
+            "encoding": self.encoder.extension,
+            "frame_store": dict(self._frame_store.stats),
+        }
+
+    def _published_endpoints(self) -> list[str]:
+        """Return the endpoint of the latest image."""
+        return [self.product.endpoint]
+
+    async def _fetch_image(self) -> bytes:
+        """Fetch the latest image."""
+        return await self.api.fetch_image(self.product.endpoint)
+
+    async def _fetch_frame_listing(self) -> list[FrameListingEntry]:
+        """Fetch the listing of available frames."""
+        return await self.api.fetch_json(
+            self.product.frames_endpoint, decode_frame_listing
+        )
+
+    async def _async_backfill_animation(self) -> None:
+        """Backfill frames and publish the animation if any frame was saved."""
+        if not await self._async_backfill():
+            return
+        animations = await self._async_add_image_job(self._build_animation)
+        self._async_publish(animations)
+
+    @callback
+    def _async_publish(self, animations: dict[str, Animation]) -> None:
+        """Publish animations built outside of a refresh, and persist them."""
+        self._async_schedule_save(animations)
+        self.async_set_updated_data(animations)
+
+    async def _async_backfill(self) -> bool:
+        """Download missing frames of the frame listing, return if any was saved."""
+        try:
+            listing = await self._fetch_frame_listing()
+        except (UpdateFailed, ClientError, TimeoutError) as err:
+            _LOGGER.warning("Unable to list %s frames: %s", self.storage_key, err)
+            return False
+
+        # the listed frames show the publish cadence
+        self._schedule.learn(entry.created.timestamp() for entry in listing)
+
+        frames = await self._async_add_image_job(self._frame_store.frames)
+        missing = _select_backfill_frames(
+            listing,
+            [frame.created for frame in frames],
+            self.scan_interval,
+            self._frame_store.max_frames,
+        )
+        if not missing:
+            return False
+
+        semaphore = asyncio.Semaphore(self.product.backfill_concurrency)
+
+        async def async_download(path: str, created: datetime) -> GifFrameRef:
+            async with semaphore:
+                image = await self.api.fetch_frame_image(path)
+            return await self._async_add_image_job(
+                self._frame_store.save, image, created
+            )
+
+        results = await asyncio.gather(
+            *(async_download(path, created) for path, created in missing),
+            return_exceptions=True,
+        )
+
+        failed = [result for result in results if isinstance(result, Exception)]
+        if failed:
+            _LOGGER.warning(
+                "Unable to backfill %s of %s %s frames: %s",
+                len(failed),
+                len(missing),
+                self.storage_key,
+                failed[0],
+            )
+
+        return any(
+            isinstance(result, GifFrameRef) and result.saved for result in results
+        )
+
+    def _save_and_build(self, image: bytes) -> dict[str, Animation]:
+        """Save an image as frame and build the animation, in one image job."""
+        self._frame_store.save(image)
+        return self._build_animation()
+
+    def _build_animation(self) -> dict[str, Animation]:
+        """Build the animation renditions of the stored frames."""
+        started = perf_counter()
+        frames = self._frame_store.frames()
+        animations = self.encoder.write(
+            self._frame_store, self.image_directory, frames[-1].created
+        )
+
+        self.metrics.observe("encode_duration", perf_counter() - started)
+        self.metrics.set("frames", len(frames))
+        for rendition, animation in animations.items():
+            self.metrics.set(f"{rendition}_size", animation.size)
+        return animations
+
+    def _render(
+        self,
+        start: datetime | None,
+        end: datetime | None,
+        step: int,
+        max_size: int | None,
+        duration: int,
+    ) -> tuple[RenderedAnimation, bool]:
+        """Render an animation of a time window, or return the cached render."""
+        frames = self._frame_store.frames_between(start, end)[::-1][::step][::-1]
+        if not frames:
+            raise ValueError("No frames in the time window")
+
+        # renders are keyed by the frames they show, not by the requested window
+        key = sha1(
+            json.dumps(
+                [
+                    self.encoder.extension,
+                    max_size,
+                    duration,
+                    [frame.image_hash for frame in frames],
+                ]
+            ).encode()
+        ).hexdigest()
+        if (render := self.render_cache.get(key)) is not None:
+            self.metrics.increment("render_cache_hits")
+            return render, True
+
+        started = perf_counter()
+        render = RenderedAnimation(
+            key,
+            key + self.encoder.extension,
+            self.encoder.content_type,
+            len(frames),
+            frames[0].created.isoformat(),
+            frames[-1].created.isoformat(),
+        )
+
+        def write(fp: BinaryIO) -> None:
+            render.frames = self.encoder.render(
+                self._frame_store,
+                self.image_directory,
+                frames,
+                max_size,
+                duration,
+                fp,
+            )
+
+        self.render_cache.put(render, write)
+        self.metrics.increment("render_cache_misses")
+        self.metrics.observe("render_duration", perf_counter() - started)
+        return render, False
+
+    def _data_to_store(self, data: dict[str, Animation]) -> Any:
+        """Prepare references to the last rendered animations to be persisted."""
+        return {
+            "renditions": {
+                rendition: {
+                    "file_name": basename(animation.path),
+                    "size": animation.size,
+                    "digest": animation.digest,
+                    "created": animation.created.isoformat(),
+                }
+                for rendition, animation in data.items()
+            }
+        }
+
+    async def _async_restore_data(self, stored: Any) -> dict[str, Animation] | None:
+        """Restore the references to the last rendered animations, if still valid."""
+        # stored before renditions, or the set of renditions was changed
+        if stored.get("renditions", {}).keys() != RENDITIONS.keys():
+            return None
+
+        animations = {}
+        for rendition, data in stored["renditions"].items():
+            # the encoding was changed, the animation has to be rebuilt
+            if splitext(data["file_name"])[1] != self.encoder.extension:
+                return None
+
+            path = join(self.image_directory, data["file_name"])
+            size = await self._async_add_image_job(getsize, path)
+            if size != data["size"]:
+                return None
+
+            # stored in naive local time before frames were stamped in utc
+            created = as_utc(datetime.fromisoformat(data["created"]))
+            animations[rendition] = Animation(
+                path, size, data["digest"], created, self.encoder.content_type
+            )
+
+        return animations
+
+    async def _async_add_image_job(self, target: Callable[..., _T], *args: Any) -> _T:
+        """Run an image pipeline job in the executor."""
+        async with self._job_lock:
+            future = self.hass.loop.run_in_executor(self._executor, target, *args)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # a running job can't be stopped, hold the lock until it finished
+                await asyncio.wait([future])
+                raise
+
+
+def _select_backfill_frames(
+    listing: list[FrameListingEntry],
+    stored: list[datetime],
+    interval: timedelta,
+    max_frames: int,
+) -> list[tuple[str, datetime]]:
+    """Select the frames of a frame listing to backfill.
+
+    Going from the newest frame back, frames are picked about one update
+    interval apart, as if they had been polled, skipping frames close to an
+    already stored frame.
+    """
+    entries = [(entry.url, entry.created) for entry in listing]
+    entries.sort(key=lambda entry: entry[1], reverse=True)
+
+    stored = sorted(stored)
+    oldest_stored = stored[0] if stored else None
+    selected: list[tuple[str, datetime]] = []
+    for path, created in entries:
+        if len(stored) + len(selected) >= max_frames and (
+            oldest_stored is None or created < oldest_stored
+        ):
+            break
+        if selected and selected[-1][1] - created < interval:
+            continue
+
+        # nearest stored frames before and after the listed frame
+        index = bisect_left(stored, created)
+        neighbours = stored[max(index - 1, 0) : index + 1]
+        if any(abs(created - frame) < interval for frame in neighbours):
+            continue
+
+        selected.append((path, created))
+
+    return selected
@@ -0,0 +1,45 @@
+"""Diagnostics support for the NOAA Solar integration."""
+
+from __future__ import annotations
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .coordinator import NOAASolarUpdateCoordinator
+
+from .const import DOMAIN, SUMMARY_KEY
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics of a config entry, including performance metrics."""
+    coordinators: dict[str, NOAASolarUpdateCoordinator] = hass.data[DOMAIN][
+        entry.entry_id
+    ]
+    api = coordinators[SUMMARY_KEY].api
+
+    return {
+        "data": dict(entry.data),
+        "options": dict(entry.options),
+        "api": {
+            "metrics": api.metrics.as_dict(),
+            "memory_caches": {
+                content: {
+                    "entries": len(cache),
+                    "size": cache.currsize,
+                    "max_size": cache.maxsize,
+                }
+                for content, cache in api.caches.items()
+            },
+            "disk_cache_size": api.disk_cache.size if api.disk_cache else None,
+            "decode_stats": {
+                url: asdict(stats) for url, stats in api.decode_stats.items()
+            },
+        },
+        "coordinators": {
+            key: coordinator.diagnostics() for key, coordinator in coordinators.items()
+        },
+    }
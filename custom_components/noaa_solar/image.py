@@ -12,14 +12,13 @@ from homeassistant.helpers.update_coordinator import (
 from homeassistant.components.image import ImageEntity
 
 from .coordinator import (
+    NOAASolarAnimationUpdateCoordinator,
     NOAASolarUpdateCoordinator,
-    NOAASolarSuvi304UpdateCoordinator,
-    NOAASolarLascoC3UpdateCoordinator,
 )
 
-from .utils.gif_utils import Gif
+from .utils.gif_utils import Animation
 
-from .const import DOMAIN
+from .const import DOMAIN, FULL_RENDITION, RENDITIONS
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -37,84 +36,63 @@ async def async_setup_entry(
     ]
 
     for _, coordinator in coordinators.items():
-        if isinstance(coordinator, NOAASolarSuvi304UpdateCoordinator):
-            async_add_entities([NOAASolarSuvi304Entity(hass, coordinator)], True)
+        if isinstance(coordinator, NOAASolarAnimationUpdateCoordinator):
+            async_add_entities(
+                [
+                    NOAASolarAnimationEntity(hass, coordinator, rendition)
+                    for rendition in RENDITIONS
+                ]
+            )
 
-        if isinstance(coordinator, NOAASolarLascoC3UpdateCoordinator):
-            async_add_entities([NOAASolarLascoC3Entity(hass, coordinator)], True)
 
+def rendition_name(name: str, rendition: str) -> str:
+    """Return the entity name of an animation rendition."""
+    if rendition == FULL_RENDITION:
+        return name
+    return f"{name} ({rendition.capitalize()})"
 
-class NOAASolarSuvi304Entity(ImageEntity, CoordinatorEntity):
-    """Representation of NOAA Suvi304 Primary images."""
 
-    def __init__(
-        self, hass: HomeAssistant, coordinator: NOAASolarSuvi304UpdateCoordinator
-    ) -> None:
-        """Initialize the NOAA Solar Suvi304 Image entity."""
-        ImageEntity.__init__(self, hass)
-        CoordinatorEntity.__init__(self, coordinator)
-
-    @property
-    def name(self) -> str:
-        """Return the name of the sensor."""
-        return "NOAA Space Weather - Suvi 304 Image"
-
-    @property
-    def content_type(self) -> str:
-        """Image content type."""
-        return "image/gif"
-
-    @property
-    def image_last_updated(self) -> datetime | None:
-        """The time when the image was last updated."""
-        gif: Gif = self.coordinator.data
-        if not gif:
-            return None
-
-        return gif.created
-
-    def image(self) -> bytes | None:
-        """Return bytes of image."""
-        gif: Gif = self.coordinator.data
-        if not gif:
-            return None
-
-        return gif.data
-
-
-class NOAASolarLascoC3Entity(ImageEntity, CoordinatorEntity):
-    """Representation of NOAA LascoC3 Primary images."""
+class NOAASolarAnimationEntity(ImageEntity, CoordinatorEntity):
+    """Representation of NOAA animated images."""
 
     def __init__(
-        self, hass: HomeAssistant, coordinator: NOAASolarLascoC3UpdateCoordinator
+        self,
+        hass: HomeAssistant,
+        coordinator: NOAASolarAnimationUpdateCoordinator,
+        rendition: str = FULL_RENDITION,
     ) -> None:
-        """Initialize the NOAA Solar LascoC3 entity."""
+        """Initialize the NOAA Solar animation entity."""
         ImageEntity.__init__(self, hass)
         CoordinatorEntity.__init__(self, coordinator)
+        self.rendition = rendition
 
     @property
     def name(self) -> str:
         """Return the name of the sensor."""
-        return "NOAA Space Weather - Lasco C3 Image"
+        return rendition_name(
+            f"NOAA Space Weather - {self.coordinator.product.name} Image",
+            self.rendition,
+        )
 
     @property
     def content_type(self) -> str:
         """Image content type."""
-        return "image/gif"
+        return self.coordinator.encoder.content_type
 
     @property
     def image_last_updated(self) -> datetime | None:
         """The time when the image was last updated."""
-        gif: Gif = self.coordinator.data
-        if not gif:
+        if not self.coordinator.data:
             return None
 
-        return gif.created
+        animation: Animation = self.coordinator.data[self.rendition]
+        return animation.created
 
     def image(self) -> bytes | None:
         """Return bytes of image."""
-        gif: Gif = self.coordinator.data
-        if not gif:
+        if not self.coordinator.data:
             return None
 
-        return gif.data
+        animation: Animation = self.coordinator.data[self.rendition]
+        # runs in the executor, the animation is only held in memory while served
+        return animation.read()
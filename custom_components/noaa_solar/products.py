@@ -0,0 +1,222 @@
+"""Products of the NOAA Solar integration."""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from os.path import join
+
+from homeassistant.core import HomeAssistant
+
+from .common import LEGACY_IMAGES_DIRECTORY, images_directory, renders_directory
+from .const import (
+    BACKFILL_CONCURRENCY,
+    CONF_DATA_SCAN_INTERVAL,
+    CONF_IMAGE_SCAN_INTERVAL,
+    DEFAULT_DATA_SCAN_INTERVAL,
+    DEFAULT_ENCODING,
+    DEFAULT_IMAGE_SCAN_INTERVAL,
+    TIME_SERIES_CAPACITY,
+)
+from .utils.frame_store import DEFAULT_MAX_FRAMES
+
+
+@dataclass(frozen=True, kw_only=True)
+class NOAASolarProductDescription:
+    """Describes a NOAA SWPC product."""
+
+    key: str
+    name: str
+    # path of the product on the api host
+    endpoint: str
+    conf_scan_interval: str
+    default_scan_interval: int
+
+
+@dataclass(frozen=True, kw_only=True)
+class NOAASolarDataProductDescription(NOAASolarProductDescription):
+    """Describes a NOAA SWPC json product."""
+
+    conf_scan_interval: str = CONF_DATA_SCAN_INTERVAL
+    default_scan_interval: int = DEFAULT_DATA_SCAN_INTERVAL
+
+
+@dataclass(frozen=True, kw_only=True)
+class NOAASolarAnimationProductDescription(NOAASolarProductDescription):
+    """Describes a NOAA SWPC animated image product."""
+
+    conf_scan_interval: str = CONF_IMAGE_SCAN_INTERVAL
+    default_scan_interval: int = DEFAULT_IMAGE_SCAN_INTERVAL
+    # path of the listing of the available frames on the api host
+    frames_endpoint: str
+    max_frames: int = DEFAULT_MAX_FRAMES
+    # parallel frame downloads while backfilling
+    backfill_concurrency: int = BACKFILL_CONCURRENCY
+    default_encoding: str = DEFAULT_ENCODING
+    enabled_by_default: bool = False
+
+    @property
+    def conf_encoding(self) -> str:
+        """Return the option key of the animation encoding."""
+        return f"{self.key}_encoding"
+
+    def image_directory(self, hass: HomeAssistant, entry_id: str) -> str:
+        """Return the directory of the frame archive and animations."""
+        return join(images_directory(hass, entry_id), self.key)
+
+    def render_directory(self, hass: HomeAssistant, entry_id: str) -> str:
+        """Return the directory of animations rendered on request."""
+        return join(renders_directory(hass, entry_id), self.key)
+
+    @property
+    def legacy_image_directory(self) -> str:
+        """Return the directory of the frame files before the frame archive."""
+        return join(LEGACY_IMAGES_DIRECTORY, self.key)
+
+
+DATA_PRODUCTS: tuple[NOAASolarDataProductDescription, ...] = (
+    NOAASolarDataProductDescription(
+        key="mag_field",
+        name="Solar Wind Magnetic Fields",
+        endpoint="/products/summary/solar-wind-mag-field.json",
+    ),
+    NOAASolarDataProductDescription(
+        key="wind_speed",
+        name="Solar Wind Speed",
+        endpoint="/products/summary/solar-wind-speed.json",
+    ),
+    NOAASolarDataProductDescription(
+        key="activity",
+        name="Solar Activity (10.7cm Flux)",
+        endpoint="/products/summary/10cm-flux.json",
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class NOAASolarTimeSeriesColumnDescription:
+    """Describes a column of a NOAA SWPC time series product."""
+
+    key: str
+    name: str
+    unit: str
+
+
+@dataclass(frozen=True, kw_only=True)
+class NOAASolarTimeSeriesProductDescription(NOAASolarProductDescription):
+    """Describes a NOAA SWPC time series product.
+
+    The endpoint is polled, the backfill endpoint covers a longer period and is
+    only fetched when the stored rows don't reach back to the polled period.
+    """
+
+    conf_scan_interval: str = CONF_DATA_SCAN_INTERVAL
+    default_scan_interval: int = DEFAULT_DATA_SCAN_INTERVAL
+    backfill_endpoint: str
+    # period covered by the polled endpoint, in seconds
+    endpoint_period: int
+    columns: tuple[NOAASolarTimeSeriesColumnDescription, ...]
+    capacity: int = TIME_SERIES_CAPACITY
+
+
+TIME_SERIES_PRODUCTS: tuple[NOAASolarTimeSeriesProductDescription, ...] = (
+    NOAASolarTimeSeriesProductDescription(
+        key="plasma",
+        name="Solar Wind Plasma",
+        endpoint="/products/solar-wind/plasma-1-day.json",
+        backfill_endpoint="/products/solar-wind/plasma-7-day.json",
+        endpoint_period=24 * 60 * 60,
+        columns=(
+            NOAASolarTimeSeriesColumnDescription(
+                key="density", name="Solar Wind Plasma Density", unit="p/cm³"
+            ),
+            NOAASolarTimeSeriesColumnDescription(
+                key="speed", name="Solar Wind Plasma Speed", unit="km/sec"
+            ),
+            NOAASolarTimeSeriesColumnDescription(
+                key="temperature", name="Solar Wind Plasma Temperature", unit="K"
+            ),
+        ),
+    ),
+    NOAASolarTimeSeriesProductDescription(
+        key="mag",
+        name="Solar Wind Magnetic Field",
+        endpoint="/products/solar-wind/mag-1-day.json",
+        backfill_endpoint="/products/solar-wind/mag-7-day.json",
+        endpoint_period=24 * 60 * 60,
+        columns=(
+            NOAASolarTimeSeriesColumnDescription(
+                key="bt", name="Solar Wind Magnetic Field Bt", unit="nT"
+            ),
+            NOAASolarTimeSeriesColumnDescription(
+                key="bx_gsm", name="Solar Wind Magnetic Field Bx (GSM)", unit="nT"
+            ),
+            NOAASolarTimeSeriesColumnDescription(
+                key="by_gsm", name="Solar Wind Magnetic Field By (GSM)", unit="nT"
+            ),
+            NOAASolarTimeSeriesColumnDescription(
+                key="bz_gsm", name="Solar Wind Magnetic Field Bz (GSM)", unit="nT"
+            ),
+        ),
+    ),
+)
+
+
+def _suvi_product(
+    wavelength: str, enabled_by_default: bool = False
+) -> NOAASolarAnimationProductDescription:
+    return NOAASolarAnimationProductDescription(
+        key=f"suvi_{wavelength}",
+        name=f"Suvi {wavelength}",
+        endpoint=f"/images/animations/suvi/primary/{wavelength}/latest.png",
+        frames_endpoint=f"/products/animations/suvi-primary-{wavelength}.json",
+        enabled_by_default=enabled_by_default,
+    )
+
+
+ANIMATION_PRODUCTS: tuple[NOAASolarAnimationProductDescription, ...] = (
+    _suvi_product("304", enabled_by_default=True),
+    NOAASolarAnimationProductDescription(
+        key="lasco_c3",
+        name="Lasco C3",
+        endpoint="/images/animations/lasco-c3/latest.jpg",
+        frames_endpoint="/products/animations/lasco-c3.json",
+        enabled_by_default=True,
+    ),
+    _suvi_product("094"),
+    _suvi_product("131"),
+    _suvi_product("171"),
+    _suvi_product("195"),
+    _suvi_product("284"),
+    NOAASolarAnimationProductDescription(
+        key="lasco_c2",
+        name="Lasco C2",
+        endpoint="/images/animations/lasco-c2/latest.jpg",
+        frames_endpoint="/products/animations/lasco-c2.json",
+    ),
+    NOAASolarAnimationProductDescription(
+        key="aurora_north",
+        name="Aurora North",
+        endpoint="/images/animations/ovation/north/latest.jpg",
+        frames_endpoint="/products/animations/ovation_north_24h.json",
+    ),
+    NOAASolarAnimationProductDescription(
+        key="aurora_south",
+        name="Aurora South",
+        endpoint="/images/animations/ovation/south/latest.jpg",
+        frames_endpoint="/products/animations/ovation_south_24h.json",
+    ),
+)
+
+PRODUCTS: dict[str, NOAASolarProductDescription] = {
+    product.key: product
+    for product in (*DATA_PRODUCTS, *TIME_SERIES_PRODUCTS, *ANIMATION_PRODUCTS)
+}
+
+# products that can be enabled in the options
+OPTIONAL_PRODUCTS: tuple[NOAASolarProductDescription, ...] = (
+    *ANIMATION_PRODUCTS,
+    *TIME_SERIES_PRODUCTS,
+)
+
+DEFAULT_PRODUCTS = [
+    product.key for product in ANIMATION_PRODUCTS if product.enabled_by_default
+]
@@ -1,22 +1,29 @@
 """Platform for sensor integration."""
 from __future__ import annotations
 import logging
+from typing import Any
 
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EntityCategory, UnitOfInformation
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
 )
 
 from .coordinator import (
+    NOAASolarSummaryUpdateCoordinator,
+    NOAASolarTimeSeriesUpdateCoordinator,
     NOAASolarUpdateCoordinator,
-    NOAASolarActivityUpdateCoordinator,
-    NOAASolarMagFieldUpdateCoordinator,
-    NOAASolarWindSpeedUpdateCoordinator,
 )
+from .products import NOAASolarTimeSeriesColumnDescription
 
-from .const import DOMAIN
+from .const import CONF_DIAGNOSTIC_SENSORS, DOMAIN, SUMMARY_KEY
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -33,22 +40,86 @@ async def async_setup_entry(
         entry.entry_id
     ]
 
-    for _, coordinator in coordinators.items():
-        if isinstance(coordinator, NOAASolarMagFieldUpdateCoordinator):
-            async_add_entities([NOAASolarMagFieldBtEntity(coordinator)], True)
-            async_add_entities([NOAASolarMagFieldBzEntity(coordinator)], True)
-
-        if isinstance(coordinator, NOAASolarWindSpeedUpdateCoordinator):
-            async_add_entities([NOAASolarWindSpeedEntity(coordinator)], True)
-
-        if isinstance(coordinator, NOAASolarActivityUpdateCoordinator):
-            async_add_entities([NOAASolarActivityEntity(coordinator)], True)
-
-
-class NOAASolarWindSpeedEntity(CoordinatorEntity):
+    coordinator = coordinators[SUMMARY_KEY]
+    async_add_entities(
+        [
+            NOAASolarMagFieldBtEntity(coordinator),
+            NOAASolarMagFieldBzEntity(coordinator),
+            NOAASolarWindSpeedEntity(coordinator),
+            NOAASolarActivityEntity(coordinator),
+        ]
+    )
+
+    for _, time_series in coordinators.items():
+        if isinstance(time_series, NOAASolarTimeSeriesUpdateCoordinator):
+            async_add_entities(
+                [
+                    NOAASolarTimeSeriesEntity(time_series, column)
+                    for column in time_series.product.columns
+                ]
+            )
+
+    if entry.options.get(CONF_DIAGNOSTIC_SENSORS, False):
+        async_add_entities(
+            [
+                NOAASolarCacheHitRatioEntity(coordinator),
+                NOAASolarDownloadedEntity(coordinator),
+                *(
+                    NOAASolarFetchDurationEntity(product_coordinator)
+                    for product_coordinator in coordinators.values()
+                ),
+            ]
+        )
+
+
+class NOAASolarSummaryEntity(CoordinatorEntity):
+    """Base of NOAA Solar summary data entities.
+
+    The state is only written when the value, the source timestamp or the
+    availability changed, unchanged updates are counted by the coordinator.
+    """
+
+    coordinator: NOAASolarSummaryUpdateCoordinator
+    product_key: str
+
+    def __init__(self, coordinator: NOAASolarSummaryUpdateCoordinator) -> None:
+        """Initialize the NOAA Solar summary entity."""
+        super().__init__(coordinator, context=self.product_key)
+        self._published: tuple[Any, ...] | None = None
+
+    async def async_added_to_hass(self) -> None:
+        """When entity is added to hass."""
+        await super().async_added_to_hass()
+        self._published = self._published_values()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        published = self._published_values()
+        if published == self._published:
+            self.coordinator.skipped_writes[self.product_key] += 1
+            return
+
+        self._published = published
+        super()._handle_coordinator_update()
+
+    def _published_values(self) -> tuple[Any, ...]:
+        if not self.available:
+            return (False,)
+
+        return (
+            True,
+            self.state,
+            self.coordinator.data[self.product_key].get("TimeStamp"),
+        )
+
+
+class NOAASolarWindSpeedEntity(NOAASolarSummaryEntity):
     """Representation of NOAA Solar wind speed data."""
 
-    def __init__(self, coordinator: NOAASolarWindSpeedUpdateCoordinator) -> None:
+    product_key = "wind_speed"
+
+    def __init__(self, coordinator: NOAASolarSummaryUpdateCoordinator) -> None:
         """Initialize the NOAA Solar wind speed entity."""
         super().__init__(coordinator)
 
@@ -60,7 +131,7 @@ class NOAASolarWindSpeedEntity(CoordinatorEntity):
     @property
     def state(self) -> int:
         """Return the state of the sensor."""
-        return self.coordinator.data["WindSpeed"]
+        return self.coordinator.data[self.product_key]["WindSpeed"]
 
     @property
     def unit_of_measurement(self) -> str:
@@ -68,10 +139,12 @@ class NOAASolarWindSpeedEntity(CoordinatorEntity):
         return "km/sec"
 
 
-class NOAASolarMagFieldBtEntity(CoordinatorEntity):
+class NOAASolarMagFieldBtEntity(NOAASolarSummaryEntity):
     """Representation NOAA Solar Magnetic Fields Bt data."""
 
-    def __init__(self, coordinator: NOAASolarMagFieldUpdateCoordinator) -> None:
+    product_key = "mag_field"
+
+    def __init__(self, coordinator: NOAASolarSummaryUpdateCoordinator) -> None:
         """Initialize the NOAA Solar Magnetic Fields Bt entity."""
         super().__init__(coordinator)
 
@@ -83,7 +156,7 @@ class NOAASolarMagFieldBtEntity(CoordinatorEntity):
     @property
     def state(self) -> int:
         """Return the state of the sensor."""
-        return self.coordinator.data["Bt"]
+        return self.coordinator.data[self.product_key]["Bt"]
 
     @property
     def unit_of_measurement(self) -> str:
@@ -91,10 +164,12 @@ class NOAASolarMagFieldBtEntity(CoordinatorEntity):
         return "nT"
 
 
-class NOAASolarMagFieldBzEntity(CoordinatorEntity):
+class NOAASolarMagFieldBzEntity(NOAASolarSummaryEntity):
     """Representation NOAA Solar Magnetic Fields Bz data."""
 
-    def __init__(self, coordinator: NOAASolarMagFieldUpdateCoordinator) -> None:
+    product_key = "mag_field"
+
+    def __init__(self, coordinator: NOAASolarSummaryUpdateCoordinator) -> None:
         """Initialize the NOAA Solar Magnetic fields Bz entity."""
         super().__init__(coordinator)
 
@@ -106,7 +181,7 @@ class NOAASolarMagFieldBzEntity(CoordinatorEntity):
     @property
     def state(self) -> int:
         """Return the state of the sensor."""
-        return self.coordinator.data["Bz"]
+        return self.coordinator.data[self.product_key]["Bz"]
 
     @property
     def unit_of_measurement(self) -> str:
@@ -114,10 +189,12 @@ class NOAASolarMagFieldBzEntity(CoordinatorEntity):
         return "nT"
 
 
-class NOAASolarActivityEntity(CoordinatorEntity):
+class NOAASolarActivityEntity(NOAASolarSummaryEntity):
     """Representation NOAA Solar activity data."""
 
-    def __init__(self, coordinator: NOAASolarActivityUpdateCoordinator) -> None:
+    product_key = "activity"
+
+    def __init__(self, coordinator: NOAASolarSummaryUpdateCoordinator) -> None:
         """Initialize the NOAA Solar activity entity."""
         super().__init__(coordinator)
 
@@ -129,9 +206,212 @@ class NOAASolarActivityEntity(CoordinatorEntity):
     @property
     def state(self) -> int:
         """Return the state of the sensor."""
-        return self.coordinator.data["Flux"]
+        return self.coordinator.data[self.product_key]["Flux"]
 
     @property
     def unit_of_measurement(self) -> str:
         """Return unit of measurement."""
         return "sfu"
+
+
+class NOAASolarTimeSeriesEntity(CoordinatorEntity):
+    """Representation of a NOAA Solar time series column.
+
+    The state is the newest value, the statistics of the configured windows
+    are exposed as attributes.
+    """
+
+    def __init__(
+        self,
+        coordinator: NOAASolarTimeSeriesUpdateCoordinator,
+        column: NOAASolarTimeSeriesColumnDescription,
+    ) -> None:
+        """Initialize the NOAA Solar time series entity."""
+        super().__init__(coordinator)
+        self.column = column
+
+    @property
+    def name(self) -> str:
+        """Return the name of the sensor."""
+        return f"NOAA Space Weather - {self.column.name}"
+
+    @property
+    def state(self) -> float | None:
+        """Return the state of the sensor."""
+        return self.coordinator.data[self.column.key]["value"]
+
+    @property
+    def unit_of_measurement(self) -> str:
+        """Return unit of measurement."""
+        return self.column.unit
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the statistics of the configured windows."""
+        attributes = {}
+        for window, stats in self.coordinator.data[self.column.key][
+            "statistics"
+        ].items():
+            for stat, value in (stats or {}).items():
+                attributes[f"{stat}_{window}"] = round(value, 2)
+        return attributes
+
+
+class NOAASolarFetchDurationEntity(CoordinatorEntity):
+    """Representation of the fetch duration of a NOAA Solar coordinator.
+
+    The state is the duration of the last successful fetch, the attributes
+    summarize the fetch, change and event loop blocking metrics.
+    """
+
+    coordinator: NOAASolarUpdateCoordinator
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator: NOAASolarUpdateCoordinator) -> None:
+        """Initialize the NOAA Solar fetch duration entity."""
+        super().__init__(coordinator)
+
+    @property
+    def name(self) -> str:
+        """Return the name of the sensor."""
+        return f"NOAA Space Weather - {self.coordinator.title} Fetch Duration"
+
+    @property
+    def available(self) -> bool:
+        """Return if the fetch duration is known, also after failed fetches."""
+        return "fetch_duration" in self.coordinator.metrics.histograms
+
+    @property
+    def state(self) -> float | None:
+        """Return the state of the sensor."""
+        return _milliseconds(self.coordinator.metrics.histograms["fetch_duration"].last)
+
+    @property
+    def unit_of_measurement(self) -> str:
+        """Return unit of measurement."""
+        return "ms"
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the fetch metrics."""
+        metrics = self.coordinator.metrics
+        attributes: dict[str, Any] = dict(metrics.counters)
+        attributes["mean_fetch_duration"] = _milliseconds(
+            metrics.histograms["fetch_duration"].mean
+        )
+        if loop_blocking := metrics.histograms.get("loop_blocking"):
+            attributes["mean_loop_blocking"] = _milliseconds(loop_blocking.mean)
+        if self.coordinator.update_interval:
+            attributes["update_interval"] = (
+                self.coordinator.update_interval.total_seconds()
+            )
+        return attributes
+
+
+class NOAASolarCacheHitRatioEntity(CoordinatorEntity):
+    """Representation of the response cache hit ratio of the NOAA api.
+
+    Revalidated responses count as hits, they don't transfer a body.
+    """
+
+    coordinator: NOAASolarSummaryUpdateCoordinator
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator: NOAASolarSummaryUpdateCoordinator) -> None:
+        """Initialize the NOAA Solar cache hit ratio entity."""
+        super().__init__(coordinator)
+
+    @property
+    def name(self) -> str:
+        """Return the name of the sensor."""
+        return "NOAA Space Weather - Cache Hit Ratio"
+
+    @property
+    def available(self) -> bool:
+        """Return if the api was used."""
+        return self._requests > 0
+
+    @property
+    def state(self) -> float:
+        """Return the state of the sensor."""
+        counters = self.coordinator.api.metrics.counters
+        return round(100 * (self._requests - counters["downloads"]) / self._requests, 1)
+
+    @property
+    def unit_of_measurement(self) -> str:
+        """Return unit of measurement."""
+        return "%"
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the cache counters."""
+        counters = self.coordinator.api.metrics.counters
+        return {
+            name: counters[name]
+            for name in (
+                "memory_hits",
+                "disk_hits",
+                "revalidated",
+                "downloads",
+                "shared_requests",
+                "errors",
+            )
+        }
+
+    @property
+    def _requests(self) -> int:
+        counters = self.coordinator.api.metrics.counters
+        return (
+            counters["memory_hits"]
+            + counters["disk_hits"]
+            + counters["revalidated"]
+            + counters["downloads"]
+        )
+
+
+class NOAASolarDownloadedEntity(CoordinatorEntity, SensorEntity):
+    """Representation of the bytes downloaded from the NOAA api.
+
+    A sensor entity, so that its state class makes it a long-term statistic.
+    """
+
+    coordinator: NOAASolarSummaryUpdateCoordinator
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_device_class = SensorDeviceClass.DATA_SIZE
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = UnitOfInformation.BYTES
+
+    def __init__(self, coordinator: NOAASolarSummaryUpdateCoordinator) -> None:
+        """Initialize the NOAA Solar downloaded entity."""
+        super().__init__(coordinator)
+
+    @property
+    def name(self) -> str:
+        """Return the name of the sensor."""
+        return "NOAA Space Weather - Downloaded"
+
+    @property
+    def native_value(self) -> int:
+        """Return the state of the sensor."""
+        return sum(self._downloaded.values())
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the downloaded bytes by content class."""
+        return self._downloaded
+
+    @property
+    def _downloaded(self) -> dict[str, int]:
+        counters = self.coordinator.api.metrics.counters
+        return {
+            name: count
+            for name, count in counters.items()
+            if name.endswith("_bytes_downloaded")
+        }
+
+
+def _milliseconds(seconds: float | None) -> float | None:
+    return round(seconds * 1000, 1) if seconds is not None else None
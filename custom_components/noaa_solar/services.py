@@ -0,0 +1,168 @@
+"""Services of the NOAA Solar integration."""
+
+from __future__ import annotations
+import logging
+
+import voluptuous as vol
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .coordinator import NOAASolarAnimationUpdateCoordinator, NOAASolarUpdateCoordinator
+from .products import ANIMATION_PRODUCTS
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_PROFILE_REBUILD = "profile_rebuild"
+SERVICE_RENDER_ANIMATION = "render_animation"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_PRODUCT = "product"
+ATTR_TOP = "top"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_PERIOD = "period"
+ATTR_STEP = "step"
+ATTR_SIZE = "size"
+ATTR_FRAME_DURATION = "frame_duration"
+DEFAULT_TOP = 10
+DEFAULT_FRAME_DURATION = 100  # ms
+
+PROFILE_REBUILD_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_PRODUCT): vol.In(
+            [product.key for product in ANIMATION_PRODUCTS]
+        ),
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_TOP, default=DEFAULT_TOP): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=50)
+        ),
+    }
+)
+
+RENDER_ANIMATION_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_PRODUCT): vol.In(
+            [product.key for product in ANIMATION_PRODUCTS]
+        ),
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Exclusive(ATTR_START, "window"): cv.datetime,
+        vol.Exclusive(ATTR_PERIOD, "window"): cv.positive_time_period,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_STEP, default=1): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(ATTR_SIZE): vol.All(vol.Coerce(int), vol.Range(min=16, max=4096)),
+        vol.Optional(ATTR_FRAME_DURATION, default=DEFAULT_FRAME_DURATION): vol.All(
+            vol.Coerce(int), vol.Range(min=20, max=10000)
+        ),
+    }
+)
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+
+    async def async_profile_rebuild(call: ServiceCall) -> ServiceResponse:
+        """Profile one frame save and animation build of an animated product."""
+        coordinator = _animation_coordinator(
+            hass, call.data[ATTR_PRODUCT], call.data.get(ATTR_CONFIG_ENTRY_ID)
+        )
+        report = await coordinator.async_profile_rebuild()
+
+        timestamp = dt_util.utcnow().strftime("%Y%m%d%H%M%S")
+        path = hass.config.path(
+            f"{DOMAIN}_profile_{coordinator.storage_key}_{timestamp}.txt"
+        )
+        await hass.async_add_executor_job(_write_report, path, report.text)
+        _LOGGER.info(
+            "Profiled %s rebuild in %.3f s, report written to %s",
+            coordinator.storage_key,
+            report.duration,
+            path,
+        )
+
+        return {"file": path, **report.summary(call.data[ATTR_TOP])}
+
+    async def async_render_animation(call: ServiceCall) -> ServiceResponse:
+        """Render an animation of the stored frames of a time window."""
+        coordinator = _animation_coordinator(
+            hass, call.data[ATTR_PRODUCT], call.data.get(ATTR_CONFIG_ENTRY_ID)
+        )
+
+        # frames are timestamped in utc, naive times are in the home time zone
+        end = dt_util.as_utc(call.data[ATTR_END]) if ATTR_END in call.data else None
+        start = None
+        if ATTR_START in call.data:
+            start = dt_util.as_utc(call.data[ATTR_START])
+        elif ATTR_PERIOD in call.data:
+            start = (end or dt_util.utcnow()) - call.data[ATTR_PERIOD]
+        if start is not None and end is not None and start > end:
+            raise ServiceValidationError("The start of the window is after its end")
+
+        try:
+            render, cached = await coordinator.async_render(
+                start,
+                end,
+                call.data[ATTR_STEP],
+                call.data.get(ATTR_SIZE),
+                call.data[ATTR_FRAME_DURATION],
+            )
+        except ValueError as err:
+            raise ServiceValidationError(
+                f"Unable to render {coordinator.storage_key}: {err}"
+            ) from err
+
+        return {
+            "file": coordinator.render_cache.path(render),
+            "content_type": render.content_type,
+            "size": render.size,
+            "frames": render.frames,
+            "start": render.start,
+            "end": render.end,
+            "cached": cached,
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE_REBUILD,
+        async_profile_rebuild,
+        schema=PROFILE_REBUILD_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_RENDER_ANIMATION,
+        async_render_animation,
+        schema=RENDER_ANIMATION_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def _animation_coordinator(
+    hass: HomeAssistant, product: str, entry_id: str | None
+) -> NOAASolarAnimationUpdateCoordinator:
+    """Return the coordinator of an enabled animated product."""
+    entries: dict[str, dict[str, NOAASolarUpdateCoordinator]] = hass.data.get(
+        DOMAIN, {}
+    )
+    for loaded_entry_id, coordinators in entries.items():
+        if entry_id is not None and loaded_entry_id != entry_id:
+            continue
+        coordinator = coordinators.get(product)
+        if isinstance(coordinator, NOAASolarAnimationUpdateCoordinator):
+            return coordinator
+
+    raise ServiceValidationError(
+        f"Product {product} is not enabled in a loaded NOAA Solar config entry"
+    )
+
+
+def _write_report(path: str, text: str) -> None:
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text)
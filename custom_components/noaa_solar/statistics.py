@@ -0,0 +1,129 @@
+"""Long-term statistics of the NOAA Solar integration."""
+
+from __future__ import annotations
+import logging
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    get_last_statistics,
+)
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .coordinator import NOAASolarTimeSeriesUpdateCoordinator
+from .products import NOAASolarTimeSeriesColumnDescription
+from .utils.time_series import HOUR
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def statistic_id(key: str, column: NOAASolarTimeSeriesColumnDescription) -> str:
+    """Return the external statistic id of a time series column."""
+    return f"{DOMAIN}:{key}_{column.key}"
+
+
+class NOAASolarStatisticsImporter:
+    """Imports hourly mean, min and max of time series into the recorder.
+
+    Whenever an hour of rows is complete, all hours after the newest imported
+    hour of a statistic (its watermark) are imported in one batch per column.
+    The time series covers a week, so gaps of up to a week, like HA being down,
+    are filled in from the rows fetched by the coordinator.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, coordinator: NOAASolarTimeSeriesUpdateCoordinator
+    ) -> None:
+        """Initialize the statistics importer."""
+        self.hass = hass
+        self.coordinator = coordinator
+        # start of the newest imported hour, by statistic id
+        self._watermarks: dict[str, float] | None = None
+        self._imported_until: float | None = None
+        self._importing = False
+
+    @callback
+    def async_start(self) -> CALLBACK_TYPE:
+        """Import statistics now and on coordinator updates, return a stop callback."""
+        self._handle_coordinator_update()
+        return self.coordinator.async_add_listener(self._handle_coordinator_update)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        if (last_time := self.coordinator.series.last_time) is None:
+            return
+
+        # rows of the hour of the newest row may still be coming in
+        until = last_time - last_time % HOUR
+        if self._importing or until == self._imported_until:
+            return
+
+        self._importing = True
+        self.coordinator.config_entry.async_create_background_task(
+            self.hass,
+            self._async_import(until),
+            f"{DOMAIN} {self.coordinator.storage_key} statistics import",
+        )
+
+    async def _async_import(self, until: float) -> None:
+        try:
+            if self._watermarks is None:
+                self._watermarks = await self._async_load_watermarks()
+
+            for column in self.coordinator.product.columns:
+                await self._async_import_column(column, until)
+
+            self._imported_until = until
+        finally:
+            self._importing = False
+
+    async def _async_load_watermarks(self) -> dict[str, float]:
+        watermarks = {}
+        for column in self.coordinator.product.columns:
+            column_id = statistic_id(self.coordinator.storage_key, column)
+            last = await get_instance(self.hass).async_add_executor_job(
+                get_last_statistics, self.hass, 1, column_id, False, {"mean"}
+            )
+            watermarks[column_id] = last[column_id][0]["start"] if last else 0.0
+        return watermarks
+
+    async def _async_import_column(
+        self, column: NOAASolarTimeSeriesColumnDescription, until: float
+    ) -> None:
+        assert self._watermarks is not None
+        column_id = statistic_id(self.coordinator.storage_key, column)
+        hours = await self.hass.async_add_executor_job(
+            self.coordinator.hourly,
+            column.key,
+            self._watermarks[column_id] + HOUR,
+            until,
+        )
+        if not hours:
+            return
+
+        metadata = StatisticMetaData(
+            has_mean=True,
+            has_sum=False,
+            name=f"NOAA Space Weather - {column.name}",
+            source=DOMAIN,
+            statistic_id=column_id,
+            unit_of_measurement=column.unit,
+        )
+        statistics = [
+            StatisticData(
+                start=dt_util.utc_from_timestamp(hour),
+                mean=mean,
+                min=minimum,
+                max=maximum,
+            )
+            for hour, mean, minimum, maximum in hours
+        ]
+        # queued as a single recorder job, imported in one transaction
+        async_add_external_statistics(self.hass, metadata, statistics)
+
+        self._watermarks[column_id] = hours[-1][0]
+        _LOGGER.debug("Imported %s hours of %s statistics", len(hours), column_id)
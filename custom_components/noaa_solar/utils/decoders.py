@@ -0,0 +1,103 @@
+"""NOAA Solar json decoders.
+
+Decoders turn parsed json into compact, typed data keeping only the fields
+the integration uses, so the parsed json can be dropped right after decoding.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from math import nan
+from typing import Any
+
+from homeassistant.util import dt as dt_util
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+@dataclass(slots=True, frozen=True)
+class FrameListingEntry:
+    """Frame of an animation frame listing."""
+
+    url: str
+    # utc, like polled frames
+    created: datetime
+
+
+@dataclass(slots=True)
+class TimeSeriesTable:
+    """Columnar rows of a SWPC product table, ordered by time."""
+
+    times: array
+    columns: dict[str, array]
+
+    def __len__(self) -> int:
+        """Return the number of rows."""
+        return len(self.times)
+
+
+def decode_frame_listing(listing: Any) -> list[FrameListingEntry]:
+    """Decode a frame listing, skipping entries without a url or valid time tag."""
+    entries = []
+    for entry in listing:
+        if "url" not in entry or "time_tag" not in entry:
+            continue
+        if not (time_tag := dt_util.parse_datetime(entry["time_tag"])):
+            continue
+        if time_tag.tzinfo is None:
+            time_tag = time_tag.replace(tzinfo=dt_util.UTC)
+        entries.append(FrameListingEntry(entry["url"], dt_util.as_utc(time_tag)))
+    return entries
+
+
+def time_series_table_decoder(
+    columns: Sequence[str],
+    since: Callable[[], float | None] | None = None,
+) -> Callable[[Any], TimeSeriesTable]:
+    """Return a decoder of a SWPC product table keeping the given columns.
+
+    The first row of a table is the header, the first column the time tag.
+    With since, only the rows newer than the time it returns are decoded, e.g.
+    the newest stored row, so a poll only converts its new rows.
+    """
+
+    def decode(rows: Any) -> TimeSeriesTable:
+        if not rows:
+            return TimeSeriesTable(
+                array("d"), {column: array("d") for column in columns}
+            )
+
+        header = rows[0]
+        # rows are time ordered, walk back to the newest known row
+        first_new = 1
+        if since is not None and (last_time := since()) is not None:
+            first_new = len(rows)
+            while first_new > 1 and _parse_time_tag(rows[first_new - 1][0]) > last_time:
+                first_new -= 1
+        body = rows[first_new:]
+        # a column at a time, so the loops stay tight
+        times = array("d", [_parse_time_tag(row[0]) for row in body])
+        values = {}
+        for column in columns:
+            position = header.index(column)
+            values[column] = array("d", [_parse_value(row[position]) for row in body])
+        return TimeSeriesTable(times, values)
+
+    return decode
+
+
+def _parse_time_tag(time_tag: str) -> float:
+    # SWPC time tags are UTC without an offset, e.g. "2024-01-01 00:00:00.000",
+    # subtracting a naive epoch is much cheaper than converting to aware times
+    return (datetime.fromisoformat(time_tag) - _EPOCH).total_seconds()
+
+
+def _parse_value(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        # missing values are null
+        return nan
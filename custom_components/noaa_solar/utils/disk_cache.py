@@ -0,0 +1,209 @@
+"""NOAA Solar response disk cache."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+from hashlib import sha1
+import json
+import logging
+from os import makedirs, remove, replace
+from os.path import exists, join
+from threading import Lock
+from time import monotonic
+
+_LOGGER = logging.getLogger(__name__)
+
+MANIFEST_FILE_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# revalidations change the manifest every poll, it is written at most this often
+MANIFEST_WRITE_INTERVAL = 5 * 60  # seconds
+
+
+@dataclass(slots=True)
+class DiskCacheEntry:
+    """Cached response body with its cache validators."""
+
+    url: str
+    file_name: str
+    size: int
+    etag: str | None
+    last_modified: str | None
+    # wall clock time, survives restarts unlike monotonic time
+    expires: float
+    # sha1 of the body, unknown for bodies cached by older versions
+    digest: str | None = None
+
+
+class DiskCache:
+    """Response bodies on disk, bounded in bytes and evicted least recently used.
+
+    The index is kept in least recently used order and persisted in a manifest
+    file, bodies are stored in files named by the hash of their url. A missing
+    or corrupt manifest starts an empty cache, orphaned bodies are overwritten
+    or left to be removed with the directory.
+
+    Bodies are only rewritten when their content changed. Manifest writes are
+    batched, a lost update only costs a revalidation, call flush to write
+    pending updates.
+
+    Calls are serialized with a lock, the cache can be used from any thread.
+    """
+
+    def __init__(self, directory: str, max_size: int) -> None:
+        """Initialize the disk cache."""
+        self.directory = directory
+        self.max_size = max_size
+        self._entries: OrderedDict[str, DiskCacheEntry] | None = None
+        self._size = 0
+        self._lock = Lock()
+        self._manifest_dirty = False
+        self._manifest_written: float | None = None
+
+    @property
+    def size(self) -> int:
+        """Return the size of the stored bodies, once the index is loaded."""
+        return self._size
+
+    def get(self, url: str) -> tuple[DiskCacheEntry, bytes] | None:
+        """Return the cached entry and body of a url."""
+        with self._lock:
+            entries = self._get_entries()
+            if (entry := entries.get(url)) is None:
+                return None
+
+            try:
+                with open(join(self.directory, entry.file_name), "rb") as file:
+                    body = file.read()
+            except OSError as err:
+                _LOGGER.debug("Dropping unreadable cached body of %s: %s", url, err)
+                self._remove(url)
+                self._save_manifest()
+                return None
+
+            # the order is persisted with the next write
+            entries.move_to_end(url)
+            return entry, body
+
+    def put(
+        self,
+        url: str,
+        body: bytes,
+        etag: str | None,
+        last_modified: str | None,
+        expires: float,
+    ) -> None:
+        """Store the body of a url, evicting least recently used bodies."""
+        digest = sha1(body).hexdigest()
+        with self._lock:
+            entries = self._get_entries()
+            entry = entries.get(url)
+            # an unchanged body only gets its validators updated
+            if (
+                entry is not None
+                and entry.digest == digest
+                and exists(join(self.directory, entry.file_name))
+            ):
+                self._update(entry, etag, last_modified, expires)
+                entries.move_to_end(url)
+                return
+
+            self._remove(url)
+            if len(body) > self.max_size:
+                self._save_manifest()
+                return
+
+            file_name = sha1(url.encode()).hexdigest()
+            makedirs(self.directory, exist_ok=True)
+            with open(join(self.directory, file_name), "wb") as file:
+                file.write(body)
+
+            entries[url] = DiskCacheEntry(
+                url, file_name, len(body), etag, last_modified, expires, digest
+            )
+            self._size += len(body)
+            while self._size > self.max_size:
+                self._remove(next(iter(entries)))
+            self._save_manifest()
+
+    def update(
+        self, url: str, etag: str | None, last_modified: str | None, expires: float
+    ) -> None:
+        """Update the validators of a revalidated body."""
+        with self._lock:
+            if (entry := self._get_entries().get(url)) is not None:
+                self._update(entry, etag, last_modified, expires)
+
+    def flush(self) -> None:
+        """Write pending manifest updates."""
+        with self._lock:
+            if self._manifest_dirty:
+                self._write_manifest()
+
+    def _update(
+        self,
+        entry: DiskCacheEntry,
+        etag: str | None,
+        last_modified: str | None,
+        expires: float,
+    ) -> None:
+        entry.etag = etag
+        entry.last_modified = last_modified
+        entry.expires = expires
+        self._save_manifest()
+
+    def _get_entries(self) -> OrderedDict[str, DiskCacheEntry]:
+        if self._entries is None:
+            self._entries = OrderedDict((entry.url, entry) for entry in self._load())
+            self._size = sum(entry.size for entry in self._entries.values())
+        return self._entries
+
+    def _remove(self, url: str) -> None:
+        if (entry := self._get_entries().pop(url, None)) is None:
+            return
+        self._size -= entry.size
+        with suppress(FileNotFoundError):
+            remove(join(self.directory, entry.file_name))
+
+    def _load(self) -> list[DiskCacheEntry]:
+        manifest_path = join(self.directory, MANIFEST_FILE_NAME)
+        try:
+            with open(manifest_path, encoding="utf-8") as file:
+                manifest = json.load(file)
+            if manifest["version"] != MANIFEST_VERSION:
+                raise ValueError(f"Unsupported manifest version {manifest['version']}")
+            return [DiskCacheEntry(**entry) for entry in manifest["entries"]]
+        except FileNotFoundError:
+            return []
+        except (ValueError, KeyError, TypeError) as err:
+            _LOGGER.warning(
+                "Response cache manifest '%s' is corrupt (%s), starting empty",
+                manifest_path,
+                err,
+            )
+            return []
+
+    def _save_manifest(self) -> None:
+        """Write the manifest, at most every MANIFEST_WRITE_INTERVAL."""
+        self._manifest_dirty = True
+        if (
+            self._manifest_written is None
+            or monotonic() - self._manifest_written >= MANIFEST_WRITE_INTERVAL
+        ):
+            self._write_manifest()
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "entries": [asdict(entry) for entry in self._get_entries().values()],
+        }
+
+        makedirs(self.directory, exist_ok=True)
+        manifest_path = join(self.directory, MANIFEST_FILE_NAME)
+        temp_path = manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file)
+        replace(temp_path, manifest_path)
+        self._manifest_dirty = False
+        self._manifest_written = monotonic()
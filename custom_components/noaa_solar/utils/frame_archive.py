@@ -0,0 +1,453 @@
+"""NOAA Solar packed frame archive."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from contextlib import suppress
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+import logging
+import mmap
+from os import makedirs, remove, replace
+from os.path import dirname, exists
+import struct
+from typing import BinaryIO
+from zlib import crc32
+
+_LOGGER = logging.getLogger(__name__)
+
+ARCHIVE_MAGIC = b"NOAAFRAM"
+ARCHIVE_VERSION = 1
+# magic, version, slots, sections, slot size
+HEADER = struct.Struct("<8sHHH2xQ")
+SECTION_NAME = struct.Struct("<16s")
+# sequence, created (utc, iso format), image hash, perceptual hash, has perceptual hash
+RECORD = struct.Struct("<Q32s20sQ?3x")
+# offset in the slot, length, crc32, width, height
+SECTION = struct.Struct("<IIIHH")
+# slots start on a page boundary and are a whole number of pages
+PAGE_SIZE = 4096
+MIN_SLOT_SIZE = 256 * 1024
+# room for the derived sections when a slot is sized for its first image
+SLOT_SIZE_FACTOR = 3
+# a full slot grows at least by this factor, so growing rewrites the archive rarely
+SLOT_GROWTH_FACTOR = 2
+
+
+@dataclass(slots=True)
+class ArchiveSection:
+    """Location of a section in its slot, with the dimensions of its image."""
+
+    offset: int
+    length: int
+    crc: int
+    width: int
+    height: int
+    # checked against the crc since the archive was opened
+    verified: bool = False
+
+
+@dataclass(slots=True)
+class ArchiveRecord:
+    """Frame stored in a slot of the archive."""
+
+    slot: int
+    # order of writes, 0 marks a free slot
+    sequence: int
+    image_hash: str
+    created: datetime
+    perceptual_hash: int | None
+    sections: dict[str, ArchiveSection] = field(default_factory=dict)
+
+
+class FrameArchive:
+    """Frames of one animated product, packed in a single file of fixed-size slots.
+
+    The file starts with a header and an index of one fixed-size record per
+    slot, followed by the slots. A slot holds the source image of a frame and
+    the images derived from it, e.g. the frame encoded per rendition, as named
+    sections. Storing a frame overwrites a whole slot, so evicting a frame
+    reclaims its slot without deleting files.
+
+    The file is memory-mapped for reading, sections are returned as views into
+    the mapping without copying. Sections are checked against their crc on
+    first read, so a torn write only costs the affected frame. Slots grow when
+    an image does not fit, by rewriting the archive.
+
+    The archive is not thread safe, all calls are expected to come from the
+    same (executor) thread.
+    """
+
+    def __init__(self, path: str, slots: int, sections: Iterable[str]) -> None:
+        """Initialize the frame archive.
+
+        Sections are the names of the images stored per frame.
+        """
+        self.path = path
+        self.slots = slots
+        self.sections = tuple(sections)
+        self.slot_size = 0
+        self._file: BinaryIO | None = None
+        self._map: mmap.mmap | None = None
+        # offset of the slots in the mapped file
+        self._data_offset = 0
+        self._records: dict[int, ArchiveRecord] | None = None
+        self._sequence = 0
+
+    def exists(self) -> bool:
+        """Return whether the archive file exists."""
+        return exists(self.path)
+
+    def records(self) -> list[ArchiveRecord]:
+        """Return the stored frames, in no particular order."""
+        return list(self._get_records().values())
+
+    def free_slot(self) -> int | None:
+        """Return a slot without frame."""
+        records = self._get_records()
+        return next((slot for slot in range(self.slots) if slot not in records), None)
+
+    def put(
+        self,
+        slot: int,
+        image_hash: str,
+        created: datetime,
+        perceptual_hash: int | None,
+        image: bytes,
+    ) -> ArchiveRecord:
+        """Store the source image of a frame in a slot, replacing its frame."""
+        self._invalidate(slot)
+        if self._file is None:
+            self._resize(self.slots, _slot_size(len(image) * SLOT_SIZE_FACTOR))
+        elif len(image) > self.slot_size:
+            self._grow(len(image) * SLOT_SIZE_FACTOR)
+
+        self._sequence += 1
+        record = ArchiveRecord(
+            slot, self._sequence, image_hash, created, perceptual_hash
+        )
+        self._write_section(record, self.sections[0], 0, image, 0, 0)
+        # resizing replaces the records
+        self._get_records()[slot] = record
+        self._write_record(record)
+        return record
+
+    def put_section(
+        self, record: ArchiveRecord, name: str, data: bytes, width: int, height: int
+    ) -> None:
+        """Store an image derived from a frame in its slot."""
+        record.sections.pop(name, None)
+        offset = self._end(record)
+        if offset + len(data) > self.slot_size:
+            self._compact(record)
+            offset = self._end(record)
+        if offset + len(data) > self.slot_size:
+            self._grow(offset + len(data))
+            offset = self._end(record)
+
+        self._write_section(record, name, offset, data, width, height)
+        self._write_record(record)
+
+    def update(self, record: ArchiveRecord) -> None:
+        """Persist the changed perceptual hash of a frame."""
+        self._write_record(record)
+
+    def remove(self, record: ArchiveRecord) -> None:
+        """Free the slot of a frame."""
+        self._invalidate(record.slot)
+
+    def read(self, record: ArchiveRecord, name: str) -> memoryview | None:
+        """Return a section of a frame, None if missing or corrupt.
+
+        The view is only valid until the archive is resized or closed.
+        """
+        if (section := record.sections.get(name)) is None or self._map is None:
+            return None
+
+        start = self._slot_offset(record.slot) + section.offset
+        view = memoryview(self._map)[start : start + section.length]
+        if not section.verified:
+            if crc32(view) != section.crc:
+                _LOGGER.warning(
+                    "Dropping corrupt %s section of frame %s in '%s'",
+                    name,
+                    record.image_hash,
+                    self.path,
+                )
+                del record.sections[name]
+                self._write_record(record)
+                return None
+            section.verified = True
+        return view
+
+    def close(self) -> None:
+        """Close the archive file."""
+        self._records = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        # views handed out keep a replaced mapping alive until they are released
+        self._map = None
+
+    def _get_records(self) -> dict[int, ArchiveRecord]:
+        if self._records is None:
+            self._records = {}
+            try:
+                self._open()
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, struct.error) as err:
+                _LOGGER.warning(
+                    "Frame archive '%s' is corrupt (%s), starting empty", self.path, err
+                )
+                self.close()
+                self._records = {}
+                with suppress(FileNotFoundError):
+                    remove(self.path)
+        return self._records
+
+    def _open(self) -> None:
+        with open(self.path, "rb") as file:
+            header = file.read(HEADER.size)
+            magic, version, slots, section_count, slot_size = HEADER.unpack(header)
+            if magic != ARCHIVE_MAGIC:
+                raise ValueError("Not a frame archive")
+            if version != ARCHIVE_VERSION:
+                raise ValueError(f"Unsupported frame archive version {version}")
+            names = [
+                SECTION_NAME.unpack(file.read(SECTION_NAME.size))[0]
+                .rstrip(b"\x00")
+                .decode()
+                for _ in range(section_count)
+            ]
+            record_size = RECORD.size + SECTION.size * section_count
+            index = file.read(record_size * slots)
+            if len(index) != record_size * slots:
+                raise ValueError("Truncated index")
+
+        records: dict[int, ArchiveRecord] = {}
+        for slot in range(slots):
+            offset = slot * record_size
+            record = _unpack_record(slot, names, index[offset : offset + record_size])
+            if record is None:
+                continue
+            # sections of other names are dropped, e.g. of a removed rendition
+            record.sections = {
+                name: section
+                for name, section in record.sections.items()
+                if name in self.sections
+            }
+            if self.sections[0] in record.sections:
+                records[slot] = record
+            self._sequence = max(self._sequence, record.sequence)
+
+        self._records = records
+        self.slot_size = slot_size
+        self._attach(_slots_offset(slots, section_count))
+
+        # the layout changed, keep the newest frames in the new layout
+        if slots != self.slots or names != list(self.sections):
+            self._resize(self.slots, slot_size)
+
+    def _attach(self, data_offset: int) -> None:
+        """Open the archive file for writing and map it for reading."""
+        self._file = open(self.path, "r+b", buffering=0)  # noqa: SIM115
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data_offset = data_offset
+
+    def _resize(self, slots: int, slot_size: int) -> None:
+        """Rewrite the archive with another slot count or size.
+
+        Frames keep their slot, unless the archive shrinks. Records are
+        updated in place.
+        """
+        records = self._get_records()
+        kept = sorted(records.values(), key=lambda record: record.created)[-slots:]
+        used = {record.slot for record in kept if record.slot < slots}
+        free = iter(slot for slot in range(slots) if slot not in used)
+        slots_offset = _slots_offset(slots, len(self.sections))
+
+        temp_path = self.path + ".tmp"
+        makedirs(dirname(self.path), exist_ok=True)
+        with open(temp_path, "w+b") as file:
+            file.truncate(slots_offset + slots * slot_size)
+            file.write(
+                HEADER.pack(
+                    ARCHIVE_MAGIC, ARCHIVE_VERSION, slots, len(self.sections), slot_size
+                )
+            )
+            for name in self.sections:
+                file.write(SECTION_NAME.pack(name.encode()))
+
+            for record in kept:
+                sections: dict[str, ArchiveSection] = {}
+                offset = 0
+                slot = record.slot if record.slot < slots else next(free)
+                for name, section in list(record.sections.items()):
+                    # sections are only dropped when the slots shrink
+                    view = self.read(record, name)
+                    if view is None or offset + len(view) > slot_size:
+                        continue
+                    file.seek(slots_offset + slot * slot_size + offset)
+                    file.write(view)
+                    sections[name] = ArchiveSection(
+                        offset,
+                        len(view),
+                        section.crc,
+                        section.width,
+                        section.height,
+                        verified=True,
+                    )
+                    offset += len(view)
+                record.slot = slot
+                record.sections = sections
+
+            self.slots = slots
+            self.slot_size = slot_size
+            self._records = {
+                record.slot: record
+                for record in kept
+                if self.sections[0] in record.sections
+            }
+            for record in self._records.values():
+                file.seek(self._record_offset(record.slot))
+                file.write(self._pack_record(record))
+
+        if self._file is not None:
+            self._file.close()
+        replace(temp_path, self.path)
+        self._attach(slots_offset)
+
+    def _grow(self, size: int) -> None:
+        """Resize the slots to hold at least the given size."""
+        self._resize(
+            self.slots, _slot_size(max(size, self.slot_size * SLOT_GROWTH_FACTOR))
+        )
+
+    def _compact(self, record: ArchiveRecord) -> None:
+        """Move the sections of a slot together, freeing the space of replaced ones."""
+        sections = {
+            name: bytes(view)
+            for name in list(record.sections)
+            if (view := self.read(record, name)) is not None
+        }
+        dimensions = {
+            name: (section.width, section.height)
+            for name, section in record.sections.items()
+        }
+        record.sections.clear()
+        offset = 0
+        for name, data in sections.items():
+            self._write_section(record, name, offset, data, *dimensions[name])
+            offset += len(data)
+        self._write_record(record)
+
+    def _invalidate(self, slot: int) -> None:
+        records = self._get_records()
+        records.pop(slot, None)
+        if self._file is not None:
+            self._file.seek(self._record_offset(slot))
+            self._file.write(bytes(RECORD.size))
+
+    def _write_section(
+        self,
+        record: ArchiveRecord,
+        name: str,
+        offset: int,
+        data: bytes,
+        width: int,
+        height: int,
+    ) -> None:
+        assert self._file is not None
+        self._file.seek(self._slot_offset(record.slot) + offset)
+        self._file.write(data)
+        record.sections[name] = ArchiveSection(
+            offset, len(data), crc32(data), width, height, verified=True
+        )
+
+    def _write_record(self, record: ArchiveRecord) -> None:
+        assert self._file is not None
+        self._file.seek(self._record_offset(record.slot))
+        self._file.write(self._pack_record(record))
+
+    def _pack_record(self, record: ArchiveRecord) -> bytes:
+        data = [
+            RECORD.pack(
+                record.sequence,
+                record.created.isoformat().encode(),
+                bytes.fromhex(record.image_hash),
+                record.perceptual_hash or 0,
+                record.perceptual_hash is not None,
+            )
+        ]
+        for name in self.sections:
+            if (section := record.sections.get(name)) is None:
+                data.append(bytes(SECTION.size))
+            else:
+                data.append(
+                    SECTION.pack(
+                        section.offset,
+                        section.length,
+                        section.crc,
+                        section.width,
+                        section.height,
+                    )
+                )
+        return b"".join(data)
+
+    def _end(self, record: ArchiveRecord) -> int:
+        return max(
+            (section.offset + section.length for section in record.sections.values()),
+            default=0,
+        )
+
+    def _record_offset(self, slot: int) -> int:
+        record_size = RECORD.size + SECTION.size * len(self.sections)
+        return HEADER.size + SECTION_NAME.size * len(self.sections) + slot * record_size
+
+    def _slot_offset(self, slot: int) -> int:
+        return self._data_offset + slot * self.slot_size
+
+
+def as_utc(value: datetime) -> datetime:
+    """Return a time in utc, naive times are taken as local time of the system.
+
+    Frames used to be stamped in naive local time.
+    """
+    return value.astimezone(UTC)
+
+
+def _unpack_record(slot: int, names: list[str], data: bytes) -> ArchiveRecord | None:
+    sequence, created, image_hash, perceptual_hash, has_perceptual_hash = (
+        RECORD.unpack_from(data)
+    )
+    if not sequence:
+        return None
+
+    record = ArchiveRecord(
+        slot,
+        sequence,
+        image_hash.hex(),
+        as_utc(datetime.fromisoformat(created.rstrip(b"\x00").decode())),
+        perceptual_hash if has_perceptual_hash else None,
+    )
+    for index, name in enumerate(names):
+        offset, length, crc, width, height = SECTION.unpack_from(
+            data, RECORD.size + index * SECTION.size
+        )
+        if length:
+            record.sections[name] = ArchiveSection(offset, length, crc, width, height)
+    return record
+
+
+def _slots_offset(slots: int, sections: int) -> int:
+    index_end = (
+        HEADER.size
+        + SECTION_NAME.size * sections
+        + slots * (RECORD.size + SECTION.size * sections)
+    )
+    return -(-index_end // PAGE_SIZE) * PAGE_SIZE
+
+
+def _slot_size(size: int) -> int:
+    return max(-(-size // PAGE_SIZE) * PAGE_SIZE, MIN_SLOT_SIZE)
@@ -0,0 +1,288 @@
+"""NOAA Solar animation frame store."""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from glob import glob
+from hashlib import sha1
+from io import BytesIO
+import json
+import logging
+from os.path import basename, exists, join
+from shutil import rmtree
+
+from PIL import Image, UnidentifiedImageError
+
+from .frame_archive import ArchiveRecord, FrameArchive, as_utc
+
+_LOGGER = logging.getLogger(__name__)
+
+ARCHIVE_FILE_NAME = "frames.bin"
+# section of the source image of a frame
+SOURCE_SECTION = "source"
+LEGACY_MANIFEST_FILE_NAME = "manifest.json"
+DEFAULT_MAX_FRAMES = 60
+# the difference hash compares 8x8 neighbouring pixels, 64 bits
+DHASH_SIZE = 8
+
+
+class GifFrameRef:
+    """GIF frame ref object."""
+
+    def __init__(self, image_hash: str, file_datetime: datetime, saved: bool) -> None:
+        """Initialize the GIF frame ref."""
+        self.image_hash = image_hash
+        self.file_datetime = file_datetime
+        self.saved = saved
+
+
+# stored frames are the records of the frame archive
+Frame = ArchiveRecord
+
+
+@dataclass(slots=True)
+class FrameImage:
+    """Image of a frame, a view into the frame archive."""
+
+    data: memoryview
+    width: int
+    height: int
+
+
+class FrameStore:
+    """Frames of one animated product, indexed by image hash.
+
+    Frames are stored in a frame archive, a single file with one slot per
+    frame that holds the source image and the images derived from it, e.g.
+    encoded per rendition. The index is kept ordered by frame time. When the
+    archive is full, a new frame takes the slot of the oldest frame.
+
+    Frames are deduplicated by their exact content. With a dedup distance,
+    frames whose perceptual hash is within that many bits of a frame next to
+    them in time are skipped as well, e.g. re-encoded images or frames that
+    only differ in their timestamp text.
+
+    Frame files of a previous storage location are imported once into a new
+    archive, and removed.
+
+    The store is not thread safe, all calls are expected to come from the same
+    (executor) thread.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_frames: int = DEFAULT_MAX_FRAMES,
+        sidecars: tuple[str, ...] = (),
+        dedup_distance: int | None = None,
+        import_directory: str | None = None,
+    ) -> None:
+        """Initialize the frame store.
+
+        Sidecars are the names of images derived from a frame, which are stored
+        and evicted together with the frame.
+        """
+        self.directory = directory
+        self.max_frames = max_frames
+        self.sidecars = sidecars
+        self.dedup_distance = dedup_distance
+        self.import_directory = import_directory
+        # saved, duplicate, similar and evicted frames
+        self.stats: Counter[str] = Counter()
+        self._archive = FrameArchive(
+            join(directory, ARCHIVE_FILE_NAME), max_frames, (SOURCE_SECTION, *sidecars)
+        )
+        self._frames: OrderedDict[str, Frame] | None = None
+
+    def save(self, data: bytes, created: datetime | None = None) -> GifFrameRef:
+        """Save an image as frame if it doesn't already exist.
+
+        Frames are timestamped in utc with the time they were saved, unless
+        the source time of the frame is known.
+        """
+        frames = self._get_frames()
+
+        image_hash = sha1(data).hexdigest()
+        if frame := frames.get(image_hash):
+            self.stats["duplicate"] += 1
+            return GifFrameRef(frame.image_hash, frame.created, False)
+
+        created = datetime.now(UTC) if created is None else as_utc(created)
+
+        perceptual_hash = None
+        if self.dedup_distance is not None:
+            perceptual_hash = difference_hash(data)
+            if similar := self._find_similar(perceptual_hash, created):
+                self.stats["similar"] += 1
+                return GifFrameRef(similar.image_hash, similar.created, False)
+
+        if (slot := self._archive.free_slot()) is None:
+            oldest = next(iter(frames.values()))
+            # a backfilled frame older than all stored frames is evicted right away
+            if created < oldest.created:
+                self.stats["evicted"] += 1
+                return GifFrameRef(image_hash, created, False)
+            del frames[oldest.image_hash]
+            self.stats["evicted"] += 1
+            slot = oldest.slot
+
+        frame = self._archive.put(slot, image_hash, created, perceptual_hash, data)
+        self._insert(frame)
+        self.stats["saved"] += 1
+        return GifFrameRef(image_hash, created, True)
+
+    def frames(self) -> list[Frame]:
+        """Return the frames ordered from oldest to newest."""
+        return list(self._get_frames().values())
+
+    def frames_between(
+        self, start: datetime | None = None, end: datetime | None = None
+    ) -> list[Frame]:
+        """Return the frames of a time window, bounds included, oldest first."""
+        frames = self.frames()
+        low, high = 0, len(frames)
+        if start is not None:
+            low = bisect_left(frames, start, key=lambda frame: frame.created)
+        if end is not None:
+            high = bisect_right(frames, end, key=lambda frame: frame.created)
+        return frames[low:high]
+
+    def read(self, frame: Frame, sidecar: str | None = None) -> FrameImage | None:
+        """Return the source image or a sidecar image of a frame.
+
+        The image is a view into the archive, it is overwritten once the frame
+        is evicted.
+        """
+        name = sidecar or SOURCE_SECTION
+        if (data := self._archive.read(frame, name)) is None:
+            return None
+        section = frame.sections[name]
+        return FrameImage(data, section.width, section.height)
+
+    def write(
+        self, frame: Frame, sidecar: str, data: bytes, width: int, height: int
+    ) -> None:
+        """Store a sidecar image of a frame."""
+        self._archive.put_section(frame, sidecar, data, width, height)
+
+    def close(self) -> None:
+        """Close the frame archive."""
+        self._archive.close()
+        self._frames = None
+
+    def _get_frames(self) -> OrderedDict[str, Frame]:
+        if self._frames is None:
+            imported = (
+                self.import_directory is not None
+                and exists(self.import_directory)
+                and not self._archive.exists()
+            )
+            frames = sorted(self._archive.records(), key=lambda frame: frame.created)
+            self._frames = OrderedDict((frame.image_hash, frame) for frame in frames)
+            if imported:
+                self._import_frames()
+        return self._frames
+
+    def _insert(self, frame: Frame) -> None:
+        frames = self._get_frames()
+        newest = next(reversed(frames.values()), None)
+        frames[frame.image_hash] = frame
+
+        # keep the index ordered by time if the clock went backwards
+        if newest and frame.created < newest.created:
+            self._frames = OrderedDict(
+                sorted(frames.items(), key=lambda item: item[1].created)
+            )
+
+    def _find_similar(self, perceptual_hash: int, created: datetime) -> Frame | None:
+        """Return a frame next in time that looks like the given perceptual hash."""
+        assert self.dedup_distance is not None
+        frames = self.frames()
+        index = bisect_left(frames, created, key=lambda frame: frame.created)
+        for frame in frames[max(index - 1, 0) : index + 1]:
+            if (frame_hash := self._perceptual_hash(frame)) is None:
+                continue
+            if (frame_hash ^ perceptual_hash).bit_count() <= self.dedup_distance:
+                return frame
+        return None
+
+    def _perceptual_hash(self, frame: Frame) -> int | None:
+        """Return the perceptual hash of a frame, hashing frames stored without."""
+        if frame.perceptual_hash is None and (image := self.read(frame)):
+            try:
+                frame.perceptual_hash = difference_hash(image.data)
+            except (OSError, UnidentifiedImageError) as err:
+                _LOGGER.debug("Unable to hash frame %s: %s", frame.image_hash, err)
+            else:
+                self._archive.update(frame)
+        return frame.perceptual_hash
+
+    def _import_frames(self) -> None:
+        """Import the frame files of the import directory into the archive."""
+        assert self.import_directory is not None
+        directory = self.import_directory
+        manifest_path = join(directory, LEGACY_MANIFEST_FILE_NAME)
+        try:
+            with open(manifest_path, encoding="utf-8") as file:
+                manifest = json.load(file)
+            files = [
+                (frame["file_name"], as_utc(datetime.fromisoformat(frame["created"])))
+                for frame in manifest["frames"]
+            ]
+        except (OSError, ValueError, KeyError, TypeError):
+            files = self._scan_frame_files(directory)
+
+        files.sort(key=lambda file: file[1])
+        for file_name, created in files[-self.max_frames :]:
+            try:
+                with open(join(directory, file_name), "rb") as file:
+                    self.save(file.read(), created)
+            except OSError as err:
+                _LOGGER.debug("Unable to import frame '%s': %s", file_name, err)
+
+        _LOGGER.info(
+            "Imported %s frames of '%s' into '%s'",
+            len(self._get_frames()),
+            directory,
+            self._archive.path,
+        )
+        rmtree(directory, ignore_errors=True)
+
+    def _scan_frame_files(self, directory: str) -> list[tuple[str, datetime]]:
+        files = []
+        for file_path in glob(join(directory, "*.png")):
+            file_name = basename(file_path)
+            try:
+                datetime_string = file_name.split(".")[0].split("_")[1]
+                created = as_utc(datetime.strptime(datetime_string, "%Y%m%d%H%M%S"))
+            except (ValueError, IndexError):
+                _LOGGER.debug("Skipping unknown frame file '%s'", file_path)
+                continue
+            files.append((file_name, created))
+        return files
+
+
+def difference_hash(data: bytes | memoryview) -> int:
+    """Return the difference hash of an image.
+
+    Each bit tells whether a pixel of a downscaled grayscale copy is brighter
+    than its right neighbour, so the hash survives re-encoding, scaling and
+    small details like timestamp text.
+    """
+    with Image.open(BytesIO(data)) as image:
+        # jpeg images can be decoded at a fraction of their size
+        image.draft("L", (DHASH_SIZE * 8, DHASH_SIZE * 8))
+        small = image.convert("L").resize(
+            (DHASH_SIZE + 1, DHASH_SIZE), Image.Resampling.BOX
+        )
+
+    pixels = small.tobytes()
+    bits = 0
+    for row in range(DHASH_SIZE):
+        for column in range(DHASH_SIZE):
+            left = pixels[row * (DHASH_SIZE + 1) + column]
+            bits = bits << 1 | (left > pixels[row * (DHASH_SIZE + 1) + column + 1])
+    return bits
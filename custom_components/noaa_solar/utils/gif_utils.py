@@ -1,73 +1,595 @@
-"""NOAA Solar gif creation utils."""
+"""NOAA Solar animation creation utils."""
 
-from hashlib import sha1
+from __future__ import annotations
 
-from contextlib import ExitStack
-from glob import glob
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from hashlib import sha1
 from io import BytesIO
-from os import makedirs, remove
-from os.path import join, basename
+import json
+import logging
+from os import makedirs, replace
+from os.path import join
 from datetime import datetime
-
-from PIL import Image
-
-
-class Gif:
-    """GIF object."""
-
-    def __init__(self, data: bytes, created: datetime) -> None:
-        """Initialize the GIF."""
-        self.data = data
+from statistics import mean
+import struct
+from typing import BinaryIO
+from zlib import crc32
+
+from PIL import Image, ImageChops, ImageStat
+
+from ..const import ANIMATION_FILE_NAME, FULL_RENDITION, RENDITIONS
+from .frame_store import Frame, FrameImage, FrameStore, GifFrameRef
+
+_LOGGER = logging.getLogger(__name__)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+WEBP_QUALITY = 80
+
+PALETTE_FILE_NAME = "palette.json"
+PALETTE_VERSION = 1
+PALETTE_COLORS = 256
+# edge length frames are reduced to, to compute a palette and its colour drift
+PALETTE_SAMPLE_SIZE = 256
+# frames spread across the stored frames the palette is computed from
+PALETTE_SAMPLE_FRAMES = 8
+# rms error, in 8 bit levels, a frame may have above the error of the frames the
+# palette was computed from, before the palette is recomputed
+PALETTE_DRIFT_THRESHOLD = 4.0
+
+
+class Animation:
+    """Animation object.
+
+    The animation itself lives on the filesystem, only its reference is kept
+    in memory.
+    """
+
+    def __init__(
+        self, path: str, size: int, digest: str, created: datetime, content_type: str
+    ) -> None:
+        """Initialize the animation."""
+        self.path = path
+        self.size = size
+        self.digest = digest
         self.created = created
+        self.content_type = content_type
 
-
-class GifFrameRef:
-    """GIF frame ref object."""
-
-    def __init__(self, file_name: str, file_datetime: datetime, saved: bool) -> None:
-        """Initialize the GIF frame ref."""
-        self.file_name = file_name
-        self.file_datetime = file_datetime
-        self.saved = saved
+    def read(self) -> bytes:
+        """Read the animation from the filesystem."""
+        with open(self.path, "rb") as file:
+            return file.read()
 
 
 def save_png_gif_frame(image: bytes, image_directory: str) -> GifFrameRef:
     """Save a png image to the file system if it doesn't already exist."""
 
-    _ensure_directory_exists(image_directory)
-    gif_frame = _save_image_if_not_exists(image_directory, image)
-
-    if gif_frame.saved:
-        _remove_excess_images(image_directory)
-
-    return gif_frame
+    return FrameStore(image_directory, sidecars=FRAME_SIDECARS).save(image)
 
 
 def create_gif(image_directory: str) -> bytes:
     """Create a gif of images in the provided image directory."""
 
-    glob_path = join(image_directory, "*.png")
-    glob_paths = glob(glob_path)
-    sorted_glob_paths = sorted(glob_paths, key=_get_datetime_from_filename)
-
-    gif = None
-    with ExitStack() as stack:
-        imgs = (stack.enter_context(Image.open(f)) for f in sorted_glob_paths)
-        img = next(imgs)
-
-        gif_memory = BytesIO()
-        img.save(
-            fp=gif_memory,
-            format="GIF",
-            append_images=imgs,
-            save_all=True,
-            duration=100,
-            optimize=True,
-            loop=0,
+    frame_store = FrameStore(image_directory, sidecars=FRAME_SIDECARS)
+    try:
+        return GifEncoder().build(frame_store)
+    finally:
+        frame_store.close()
+
+
+def rendition_suffix(rendition: str) -> str:
+    """Return the file name suffix of a rendition, the full rendition has none."""
+    return "" if rendition == FULL_RENDITION else "_" + rendition
+
+
+class AnimationEncoder(ABC):
+    """Incremental animation encoder.
+
+    Every frame is encoded only once, into a single frame image stored with the
+    frame in the frame store. The encoded frames are spliced from the memory
+    mapped frame archive into a new animation whenever frames are added or
+    evicted, so memory use does not grow with the animation size.
+    """
+
+    content_type: str
+    extension: str
+
+    def __init__(self, duration: int = 100) -> None:
+        """Initialize the animation encoder."""
+        self.duration = duration
+
+    def build(self, frame_store: FrameStore) -> bytes:
+        """Create an animation of the frames of a frame store."""
+
+        renditions: dict[str, int | None] = {FULL_RENDITION: None}
+        frames = [
+            encoded[FULL_RENDITION]
+            for frame in frame_store.frames()
+            if (encoded := self._ensure_frames(frame_store, frame, renditions))
+        ]
+        memory = BytesIO()
+        self._splice(frames, memory, self.duration)
+        return memory.getvalue()
+
+    def write(
+        self,
+        frame_store: FrameStore,
+        directory: str,
+        created: datetime,
+        renditions: dict[str, int | None] = RENDITIONS,
+    ) -> dict[str, Animation]:
+        """Write an animation of the frames of a frame store per rendition.
+
+        Each frame is decoded at most once, all renditions are resampled from
+        the decoded frame.
+        """
+
+        _ensure_directory_exists(directory)
+        self._prepare(frame_store, directory)
+        frames = [
+            encoded
+            for frame in frame_store.frames()
+            if (encoded := self._ensure_frames(frame_store, frame, renditions))
+        ]
+
+        animations = {}
+        for rendition in renditions:
+            path = join(
+                directory,
+                ANIMATION_FILE_NAME + rendition_suffix(rendition) + self.extension,
+            )
+
+            # write next to the target and swap, so readers never see a partial file
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as file:
+                digest = self._splice(
+                    [frame[rendition] for frame in frames], file, self.duration
+                )
+                size = file.tell()
+            replace(temp_path, path)
+
+            animations[rendition] = Animation(
+                path, size, digest, created, self.content_type
+            )
+
+        return animations
+
+    def render(
+        self,
+        frame_store: FrameStore,
+        directory: str,
+        frames: list[Frame],
+        max_size: int | None,
+        duration: int,
+        fp: BinaryIO,
+    ) -> int:
+        """Write an animation of some frames, return the number of frames shown.
+
+        Frames at the size of a rendition are spliced from the frame store,
+        encoding them if needed. Frames at other sizes are encoded for this
+        animation only. Raises ValueError when none of the frames can be read.
+        """
+
+        _ensure_directory_exists(directory)
+        self._prepare(frame_store, directory)
+        rendition = next(
+            (rendition for rendition, size in RENDITIONS.items() if size == max_size),
+            None,
+        )
+
+        encoded_frames = []
+        for frame in frames:
+            if rendition is not None:
+                encoded = self._ensure_frames(frame_store, frame, {rendition: max_size})
+                image = encoded.get(rendition) if encoded else None
+            elif (decoded := self._decode(frame_store, frame)) is not None:
+                resized = _resample(decoded, max_size)
+                buffer = BytesIO()
+                self._encode_frame(resized, buffer)
+                image = FrameImage(buffer.getbuffer(), resized.width, resized.height)
+            else:
+                image = None
+            if image is not None:
+                encoded_frames.append(image)
+
+        if not encoded_frames:
+            raise ValueError("None of the frames can be read")
+        self._splice(encoded_frames, fp, duration)
+        return len(encoded_frames)
+
+    def _splice(self, frames: list[FrameImage], fp: BinaryIO, duration: int) -> str:
+        digest = sha1()
+
+        def write(data: bytes | memoryview) -> None:
+            digest.update(data)
+            fp.write(data)
+
+        self._write_animation(frames, write, duration)
+        return digest.hexdigest()
+
+    def _ensure_frames(
+        self,
+        frame_store: FrameStore,
+        frame: Frame,
+        renditions: dict[str, int | None],
+    ) -> dict[str, FrameImage] | None:
+        """Encode a frame into a single frame image per rendition, unless already encoded.
+
+        Returns None for a frame whose source image can't be read.
+        """
+
+        sidecars = {
+            rendition: rendition_suffix(rendition) + self.extension
+            for rendition in renditions
+        }
+        missing = [
+            rendition
+            for rendition, sidecar in sidecars.items()
+            if (encoded := frame_store.read(frame, sidecar)) is None
+            or not self._is_current(encoded)
+        ]
+
+        if missing:
+            if (decoded := self._decode(frame_store, frame)) is None:
+                return None
+
+            for rendition in missing:
+                resized = _resample(decoded, renditions[rendition])
+                buffer = BytesIO()
+                self._encode_frame(resized, buffer)
+                frame_store.write(
+                    frame,
+                    sidecars[rendition],
+                    buffer.getvalue(),
+                    resized.width,
+                    resized.height,
+                )
+
+        # read after writing, storing a sidecar may move the others of the frame
+        encoded_frames = {
+            rendition: frame_store.read(frame, sidecar)
+            for rendition, sidecar in sidecars.items()
+        }
+        return {
+            rendition: encoded
+            for rendition, encoded in encoded_frames.items()
+            if encoded is not None
+        }
+
+    def _decode(self, frame_store: FrameStore, frame: Frame) -> Image.Image | None:
+        """Decode the source image of a frame, None if it can't be read."""
+        try:
+            if (source := frame_store.read(frame)) is None:
+                raise ValueError("Source image is missing")
+            with Image.open(BytesIO(source.data)) as img:
+                return img.convert("RGB")
+        except (OSError, ValueError) as err:
+            _LOGGER.warning("Skipping frame %s: %s", frame.image_hash, err)
+            return None
+
+    def _prepare(self, frame_store: FrameStore, directory: str) -> None:
+        """Prepare writing an animation, before its frames are encoded."""
+
+    def _is_current(self, encoded: FrameImage) -> bool:
+        """Return whether an encoded frame can be spliced as is."""
+        return True
+
+    @abstractmethod
+    def _encode_frame(self, frame: Image.Image, fp: BinaryIO) -> None:
+        """Encode a single frame image."""
+
+    @abstractmethod
+    def _write_animation(
+        self,
+        frames: list[FrameImage],
+        write: Callable[[bytes | memoryview], None],
+        duration: int,
+    ) -> None:
+        """Splice encoded frames into a looping animation, duration in ms per frame."""
+
+
+class SharedPalette:
+    """Palette shared by all frames of an animation.
+
+    The error is the colour error of the frames the palette was computed from,
+    the baseline to measure the colour drift of later frames against.
+    """
+
+    def __init__(self, colors: bytes, error: float = 0.0) -> None:
+        """Initialize the shared palette of 256 rgb colors."""
+        self.colors = colors
+        self.error = error
+        self.image = Image.new("P", (1, 1))
+        self.image.putpalette(colors)
+
+    @classmethod
+    def from_frames(cls, frames: list[Image.Image]) -> SharedPalette:
+        """Compute the palette of frames, quantizing a montage of them once."""
+        samples = [_palette_sample(frame) for frame in frames]
+        # the quantizer only counts colours, the pixels are laid out in one row
+        pixels = b"".join(sample.tobytes() for sample in samples)
+        sample = Image.frombytes("RGB", (len(pixels) // 3, 1), pixels)
+        colors = bytes(sample.quantize(colors=PALETTE_COLORS).getpalette() or ())
+        palette = cls(colors.ljust(PALETTE_COLORS * 3, b"\x00"))
+        palette.error = palette.sample_error(sample)
+        return palette
+
+    def error_of(self, frame: Image.Image) -> float:
+        """Return the rms colour error of a frame quantized to the palette."""
+        return self.sample_error(_palette_sample(frame))
+
+    def sample_error(self, sample: Image.Image) -> float:
+        """Return the rms colour error of a reduced frame quantized to the palette."""
+        quantized = self.quantize(sample).convert("RGB")
+        return mean(ImageStat.Stat(ImageChops.difference(sample, quantized)).rms)
+
+    def quantize(self, frame: Image.Image) -> Image.Image:
+        """Map a frame to the palette.
+
+        Frames are not dithered, dither noise differs from frame to frame and
+        compresses badly.
+        """
+        return frame.quantize(palette=self.image, dither=Image.Dither.NONE)
+
+
+class GifEncoder(AnimationEncoder):
+    """Incremental gif encoder, frames are quantized and LZW encoded once.
+
+    Frames are quantized to a palette shared by the animation, which becomes
+    the global color table, so frames carry no local color tables. The palette
+    is computed from frames spread across the stored frames, including the
+    newest, and kept while the colour drift of new frames stays below a
+    threshold. When it is recomputed, frames quantized to the previous palette
+    are quantized again.
+    """
+
+    content_type = "image/gif"
+    extension = ".gif"
+
+    def __init__(self, duration: int = 100) -> None:
+        """Initialize the gif encoder."""
+        super().__init__(duration)
+        self._palette: SharedPalette | None = None
+        self._palette_loaded = False
+        # newest frame the colour drift was measured on
+        self._drift_checked: str | None = None
+
+    def _prepare(self, frame_store: FrameStore, directory: str) -> None:
+        if not self._palette_loaded:
+            self._palette_loaded = True
+            self._palette = _load_palette(directory)
+
+        frames = frame_store.frames()
+        newest = frames[-1]
+        if newest.image_hash == self._drift_checked:
+            return
+        self._drift_checked = newest.image_hash
+
+        if (frame := self._decode(frame_store, newest)) is None:
+            return
+
+        if self._palette is not None:
+            error = self._palette.error_of(frame)
+            if error <= self._palette.error + PALETTE_DRIFT_THRESHOLD:
+                return
+            _LOGGER.debug(
+                "Colour drift %.1f of the gif palette in '%s'",
+                error - self._palette.error,
+                directory,
+            )
+
+        samples = [
+            sample
+            for stored in _spread(frames[:-1], PALETTE_SAMPLE_FRAMES - 1)
+            if (sample := self._decode(frame_store, stored)) is not None
+        ]
+        self._palette = SharedPalette.from_frames([*samples, frame])
+        _save_palette(directory, self._palette)
+
+    def _is_current(self, encoded: FrameImage) -> bool:
+        if self._palette is None:
+            return True
+        return _parse_gif_frame(encoded.data).palette == self._palette.colors
+
+    def _encode_frame(self, frame: Image.Image, fp: BinaryIO) -> None:
+        if self._palette is None:
+            frame.quantize(colors=256).save(fp, format="GIF", interlace=False)
+            return
+
+        # keep the full palette, so the frame can use the global color table
+        self._palette.quantize(frame).save(
+            fp, format="GIF", interlace=False, optimize=False
         )
-        gif = gif_memory.getbuffer().tobytes()
 
-    return gif
+    def _write_animation(
+        self,
+        frames: list[FrameImage],
+        write: Callable[[bytes | memoryview], None],
+        duration: int,
+    ) -> None:
+        width = max(frame.width for frame in frames)
+        height = max(frame.height for frame in frames)
+        global_palette = self._palette.colors if self._palette else None
+
+        write(b"GIF89a")
+        if global_palette:
+            flags = 0x80 | _color_table_bits(global_palette)
+            write(struct.pack("<HHBBB", width, height, flags, 0, 0))
+            write(global_palette)
+        else:
+            write(struct.pack("<HHBBB", width, height, 0, 0, 0))
+        # loop forever
+        write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00")
+
+        delay = duration // 10
+        for encoded_frame in frames:
+            frame = _parse_gif_frame(encoded_frame.data)
+
+            # graphic control extension, keep the previous frame as background
+            write(struct.pack("<BBBBHBB", 0x21, 0xF9, 4, 0x04, delay, 0, 0))
+            if frame.palette == global_palette:
+                write(struct.pack("<BHHHHB", 0x2C, 0, 0, frame.width, frame.height, 0))
+            else:
+                write(
+                    struct.pack(
+                        "<BHHHHB",
+                        0x2C,
+                        0,
+                        0,
+                        frame.width,
+                        frame.height,
+                        0x80 | _color_table_bits(frame.palette),
+                    )
+                )
+                write(frame.palette)
+            write(frame.image_data)
+
+        write(b"\x3b")
+
+
+class WebpEncoder(AnimationEncoder):
+    """Incremental animated webp encoder, frames are VP8 encoded once."""
+
+    content_type = "image/webp"
+    extension = ".webp"
+
+    def _encode_frame(self, frame: Image.Image, fp: BinaryIO) -> None:
+        frame.save(fp, format="WEBP", quality=WEBP_QUALITY, method=4)
+
+    def _write_animation(
+        self,
+        frames: list[FrameImage],
+        write: Callable[[bytes | memoryview], None],
+        duration: int,
+    ) -> None:
+        width = max(frame.width for frame in frames)
+        height = max(frame.height for frame in frames)
+
+        # the riff header holds the file size, so locate the image chunks first
+        frame_chunks = [_find_webp_image_chunks(frame.data) for frame in frames]
+        has_alpha = any(
+            chunk_type == b"ALPH"
+            for chunks in frame_chunks
+            for chunk_type, _, _ in chunks
+        )
+
+        anmf_sizes = [
+            16 + sum(length for _, _, length in chunks) for chunks in frame_chunks
+        ]
+        riff_size = 4 + (8 + 10) + (8 + 6) + sum(8 + size for size in anmf_sizes)
+
+        write(b"RIFF" + struct.pack("<I", riff_size) + b"WEBP")
+        flags = 0x02 | (0x10 if has_alpha else 0)
+        write(b"VP8X" + struct.pack("<I", 10) + struct.pack("<I", flags))
+        write(_uint24(width - 1) + _uint24(height - 1))
+        # transparent background, loop forever
+        write(b"ANIM" + struct.pack("<IIH", 6, 0, 0))
+
+        for frame, chunks, anmf_size in zip(frames, frame_chunks, anmf_sizes):
+            write(b"ANMF" + struct.pack("<I", anmf_size))
+            write(_uint24(0) + _uint24(0))
+            write(_uint24(frame.width - 1) + _uint24(frame.height - 1))
+            # do not blend with the previous frame
+            write(_uint24(duration) + b"\x02")
+            for _, offset, length in chunks:
+                write(frame.data[offset : offset + length])
+
+
+class ApngEncoder(AnimationEncoder):
+    """Incremental animated png encoder, frames are deflated once."""
+
+    content_type = "image/apng"
+    extension = ".apng"
+
+    def _encode_frame(self, frame: Image.Image, fp: BinaryIO) -> None:
+        frame.save(fp, format="PNG")
+
+    def _write_animation(
+        self,
+        frames: list[FrameImage],
+        write: Callable[[bytes | memoryview], None],
+        duration: int,
+    ) -> None:
+        # all frames share the header of the first frame
+        first = frames[0]
+        frames = [
+            frame
+            for frame in frames
+            if (frame.width, frame.height) == (first.width, first.height)
+        ]
+
+        def write_chunk(chunk_type: bytes, data: bytes | memoryview) -> None:
+            write(struct.pack(">I", len(data)) + chunk_type)
+            write(data)
+            write(struct.pack(">I", crc32(data, crc32(chunk_type))))
+
+        write(PNG_SIGNATURE)
+        sequence = 0
+        for index, frame in enumerate(frames):
+            chunks = _parse_png_chunks(frame.data)
+
+            if index == 0:
+                write_chunk(b"IHDR", chunks[b"IHDR"][0])
+                # loop forever
+                write_chunk(b"acTL", struct.pack(">II", len(frames), 0))
+
+            write_chunk(
+                b"fcTL",
+                struct.pack(
+                    ">IIIIIHHBB",
+                    sequence,
+                    frame.width,
+                    frame.height,
+                    0,
+                    0,
+                    duration,
+                    1000,
+                    0,
+                    0,
+                ),
+            )
+            sequence += 1
+
+            for data in chunks[b"IDAT"]:
+                # the first frame doubles as the static png image
+                if index == 0:
+                    write_chunk(b"IDAT", data)
+                else:
+                    write_chunk(b"fdAT", b"".join((struct.pack(">I", sequence), data)))
+                    sequence += 1
+
+        write_chunk(b"IEND", b"")
+
+
+ANIMATION_ENCODERS: dict[str, type[AnimationEncoder]] = {
+    "gif": GifEncoder,
+    "webp": WebpEncoder,
+    "apng": ApngEncoder,
+}
+
+# files derived from a frame, removed together with the frame
+FRAME_SIDECARS = tuple(
+    rendition_suffix(rendition) + encoder.extension
+    for encoder in ANIMATION_ENCODERS.values()
+    for rendition in RENDITIONS
+)
+
+
+class GifFrame:
+    """Quantized and LZW encoded GIF frame."""
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        palette: bytes | memoryview,
+        image_data: bytes | memoryview,
+    ) -> None:
+        """Initialize the GIF frame."""
+        self.width = width
+        self.height = height
+        self.palette = palette
+        self.image_data = image_data
 
 
 def save_gif(directory: str, gif_name: str, data: bytes) -> None:
@@ -79,44 +601,147 @@ def save_gif(directory: str, gif_name: str, data: bytes) -> None:
         file.write(data)
 
 
-def _save_image_if_not_exists(directory: str, data: bytes) -> GifFrameRef:
-    image_hash = sha1(data).hexdigest()
-    glob_path = join(directory, image_hash + "*.png")
-    glob_paths = glob(glob_path)
+def _parse_gif_frame(data: bytes | memoryview) -> GifFrame:
+    """Extract the palette and image data of a single frame gif."""
+
+    # logical screen descriptor with optional global color table
+    flags = data[10]
+    offset = 13
+    palette = b""
+    if flags & 0x80:
+        palette_size = 3 << ((flags & 0x07) + 1)
+        palette = data[offset : offset + palette_size]
+        offset += palette_size
+
+    # skip extensions up to the image descriptor
+    while data[offset] == 0x21:
+        offset = _skip_sub_blocks(data, offset + 2)
+
+    if data[offset] != 0x2C:
+        raise ValueError("Gif frame has no image descriptor")
+
+    width, height = struct.unpack_from("<HH", data, offset + 5)
+    flags = data[offset + 9]
+    offset += 10
+    if flags & 0x80:
+        palette_size = 3 << ((flags & 0x07) + 1)
+        palette = data[offset : offset + palette_size]
+        offset += palette_size
+
+    # lzw minimum code size followed by the image data sub blocks
+    end = _skip_sub_blocks(data, offset + 1)
+    return GifFrame(width, height, palette, data[offset:end])
+
+
+def _color_table_bits(palette: bytes) -> int:
+    """Return the size field of a color table, 2^(size + 1) colors."""
+    return max(len(palette) // 3 - 1, 1).bit_length() - 1
+
+
+def _resample(frame: Image.Image, max_size: int | None) -> Image.Image:
+    """Return a frame reduced to a maximum edge length, the frame if it fits."""
+    if not max_size or max(frame.size) <= max_size:
+        return frame
+    resized = frame.copy()
+    resized.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    return resized
+
+
+def _spread(frames: list[Frame], count: int) -> list[Frame]:
+    """Return up to count frames evenly spread from the oldest to the newest."""
+    if len(frames) <= count:
+        return frames
+    step = (len(frames) - 1) / (count - 1)
+    return [frames[round(index * step)] for index in range(count)]
+
+
+def _palette_sample(frame: Image.Image) -> Image.Image:
+    sample = frame.convert("RGB")
+    if max(sample.size) > PALETTE_SAMPLE_SIZE:
+        sample.thumbnail((PALETTE_SAMPLE_SIZE, PALETTE_SAMPLE_SIZE))
+    return sample
+
+
+def _load_palette(directory: str) -> SharedPalette | None:
+    path = join(directory, PALETTE_FILE_NAME)
+    try:
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+        if data["version"] != PALETTE_VERSION:
+            raise ValueError(f"Unsupported palette version {data['version']}")
+        colors = bytes.fromhex(data["colors"])
+        if len(colors) != PALETTE_COLORS * 3:
+            raise ValueError(f"Palette has {len(colors) // 3} colors")
+        return SharedPalette(colors, data["error"])
+    except FileNotFoundError:
+        return None
+    except (ValueError, KeyError, TypeError) as err:
+        _LOGGER.warning("Gif palette '%s' is corrupt (%s), recomputing", path, err)
+        return None
+
+
+def _save_palette(directory: str, palette: SharedPalette) -> None:
+    path = join(directory, PALETTE_FILE_NAME)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "version": PALETTE_VERSION,
+                "colors": palette.colors.hex(),
+                "error": palette.error,
+            },
+            file,
+        )
+    replace(temp_path, path)
 
-    if glob_paths:
-        file_name = glob_paths[0]
-        file_datetime = _get_datetime_from_filename(file_name)
-        return GifFrameRef(file_name, file_datetime, False)
 
-    current_datetime = datetime.now()
-    image_name = image_hash + "_" + current_datetime.strftime("%Y%m%d%H%M%S") + ".png"
+def _skip_sub_blocks(data: bytes | memoryview, offset: int) -> int:
+    while block_size := data[offset]:
+        offset += block_size + 1
+    return offset + 1
 
-    file_path = join(directory, image_name)
-    with open(file_path, "wb") as file:
-        file.write(data)
 
-    return GifFrameRef(image_name, current_datetime, True)
+def _find_webp_image_chunks(data: bytes | memoryview) -> list[tuple[bytes, int, int]]:
+    """Locate the image chunks (with header and padding) of a single frame webp."""
 
+    if data[:4] != b"RIFF" or data[8:12] != b"WEBP":
+        raise ValueError("Not a webp image")
 
-def _ensure_directory_exists(directory: str) -> None:
-    makedirs(directory, exist_ok=True)
+    chunks = []
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_type = bytes(data[offset : offset + 4])
+        (chunk_size,) = struct.unpack_from("<I", data, offset + 4)
+        length = 8 + chunk_size + (chunk_size & 1)
+        if chunk_type in (b"ALPH", b"VP8 ", b"VP8L"):
+            chunks.append((chunk_type, offset, length))
+        offset += length
 
+    return chunks
 
-def _get_datetime_from_filename(file_path: str) -> datetime:
-    file_name = basename(file_path)
-    datetime_string = file_name.split("_")[1].split(".")[0]
-    return datetime.strptime(datetime_string, "%Y%m%d%H%M%S")
 
+def _parse_png_chunks(
+    data: bytes | memoryview,
+) -> dict[bytes, list[bytes | memoryview]]:
+    """Split a png image into the data of its chunks, by chunk type."""
 
-def _remove_excess_images(directory: str) -> None:
-    glob_path = join(directory, "*.png")
-    glob_paths = glob(glob_path)
-    sorted_glob_paths = sorted(glob_paths, key=_get_datetime_from_filename)
+    if data[:8] != PNG_SIGNATURE:
+        raise ValueError("Not a png image")
 
-    max_images = 60
-    if len(glob_paths) >= max_images:
-        excess_count = len(sorted_glob_paths) - max_images
+    chunks: dict[bytes, list[bytes | memoryview]] = {}
+    offset = 8
+    while offset < len(data):
+        (length,) = struct.unpack_from(">I", data, offset)
+        chunk_type = bytes(data[offset + 4 : offset + 8])
+        chunks.setdefault(chunk_type, []).append(data[offset + 8 : offset + 8 + length])
+        offset += length + 12
 
-        for i in range(excess_count):
-            remove(sorted_glob_paths[i])
+    return chunks
+
+
+def _uint24(value: int) -> bytes:
+    return struct.pack("<I", value)[:3]
+
+
+def _ensure_directory_exists(directory: str) -> None:
+    makedirs(directory, exist_ok=True)
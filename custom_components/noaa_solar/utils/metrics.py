@@ -0,0 +1,88 @@
+"""NOAA Solar performance metrics."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Sequence
+from typing import Any
+
+# upper bounds of histogram buckets, in seconds
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BLOCKING_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+class Histogram:
+    """Counts of observed values by bucket, with their count, sum and last value."""
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        """Initialize the histogram with the upper bounds of its buckets."""
+        self.bounds = tuple(bounds)
+        # the last bucket counts values above the last bound
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.last: float | None = None
+
+    def observe(self, value: float) -> None:
+        """Add an observed value."""
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.last = value
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean of the observed values."""
+        return self.sum / self.count if self.count else None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a serializable representation of the histogram."""
+        labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.mean,
+            "last": self.last,
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class Metrics:
+    """Named counters, histograms and gauges.
+
+    Metrics are cheap enough to be always on. Writers are the event loop and
+    the executor jobs of the owner, readers only take snapshots.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.counters: Counter[str] = Counter()
+        self.histograms: dict[str, Histogram] = {}
+        self.gauges: dict[str, float] = {}
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Increment a counter."""
+        self.counters[name] += amount
+
+    def observe(
+        self, name: str, value: float, bounds: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        """Add a value to a histogram, created with the given bounds."""
+        if (histogram := self.histograms.get(name)) is None:
+            histogram = self.histograms[name] = Histogram(bounds)
+        histogram.observe(value)
+
+    def set(self, name: str, value: float) -> None:
+        """Set a gauge."""
+        self.gauges[name] = value
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a serializable snapshot of the metrics."""
+        return {
+            "counters": dict(self.counters),
+            "histograms": {
+                name: histogram.as_dict() for name, histogram in self.histograms.items()
+            },
+            "gauges": dict(self.gauges),
+        }
@@ -0,0 +1,117 @@
+"""NOAA Solar profiling utils."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+import cProfile
+from dataclasses import dataclass, field
+from io import StringIO
+import pstats
+from time import perf_counter
+import tracemalloc
+from typing import Any, TypeVar
+
+_T = TypeVar("_T")
+
+# functions and allocators in the report file
+PROFILE_TOP = 50
+
+
+@dataclass(slots=True)
+class ProfileReport:
+    """Call statistics and top allocators of a profiled call."""
+
+    # seconds, including the profiling overhead
+    duration: float
+    # bytes allocated at the peak of the call
+    peak_memory: int
+    # cumulative time per function, most expensive first
+    functions: list[dict[str, Any]] = field(default_factory=list)
+    # allocated bytes per source line, largest first
+    allocators: list[dict[str, Any]] = field(default_factory=list)
+    # the full report, as written to the report file
+    text: str = ""
+
+    def summary(self, top: int) -> dict[str, Any]:
+        """Return a serializable summary with the top functions and allocators."""
+        return {
+            "duration": self.duration,
+            "peak_memory": self.peak_memory,
+            "functions": self.functions[:top],
+            "allocators": self.allocators[:top],
+        }
+
+
+def profile(target: Callable[..., _T], *args: Any) -> tuple[_T, ProfileReport]:
+    """Run a call under cProfile and tracemalloc.
+
+    cProfile only sees the calling thread. tracemalloc traces the whole process,
+    allocations of other threads during the call are part of the report. A
+    trace that was already running is left running.
+    """
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline_snapshot = tracemalloc.take_snapshot()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    profiler = cProfile.Profile()
+    started = perf_counter()
+    try:
+        result = profiler.runcall(target, *args)
+    finally:
+        duration = perf_counter() - started
+        peak_memory = tracemalloc.get_traced_memory()[1] - baseline
+        snapshot = tracemalloc.take_snapshot()
+        if not tracing:
+            tracemalloc.stop()
+
+    out = StringIO()
+    stats = pstats.Stats(profiler, stream=out).sort_stats(pstats.SortKey.CUMULATIVE)
+    allocations = _compare_snapshots(snapshot, baseline_snapshot)[:PROFILE_TOP]
+
+    report = ProfileReport(duration, peak_memory)
+    for (file_name, line, name), (_, calls, total, cumulative, _) in sorted(
+        stats.stats.items(),  # type: ignore[attr-defined]
+        key=lambda item: item[1][3],
+        reverse=True,
+    )[:PROFILE_TOP]:
+        report.functions.append(
+            {
+                "function": f"{file_name}:{line}({name})",
+                "calls": calls,
+                "total_time": total,
+                "cumulative_time": cumulative,
+            }
+        )
+    for allocation in allocations:
+        report.allocators.append(
+            {
+                "line": str(allocation.traceback[0]),
+                "size": allocation.size_diff,
+                "count": allocation.count_diff,
+            }
+        )
+
+    out.write(f"Duration: {duration:.3f} s\n")
+    out.write(f"Peak memory: {peak_memory} B\n\n")
+    stats.print_stats(PROFILE_TOP)
+    out.write("Top allocators, retained since the start of the call:\n\n")
+    out.writelines(f"{allocation}\n" for allocation in allocations)
+    report.text = out.getvalue()
+    return result, report
+
+
+def _compare_snapshots(
+    snapshot: tracemalloc.Snapshot, baseline: tracemalloc.Snapshot
+) -> list[tracemalloc.StatisticDiff]:
+    """Return the allocation differences by source line, largest first."""
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, __file__),
+    ]
+    return snapshot.filter_traces(filters).compare_to(
+        baseline.filter_traces(filters), "lineno"
+    )
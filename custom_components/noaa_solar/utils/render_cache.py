@@ -0,0 +1,147 @@
+"""NOAA Solar rendered animation cache."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Callable
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+import json
+import logging
+from os import makedirs, remove, replace
+from os.path import exists, join
+from typing import BinaryIO
+
+_LOGGER = logging.getLogger(__name__)
+
+MANIFEST_FILE_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+@dataclass(slots=True)
+class RenderedAnimation:
+    """Animation rendered for a time window of the stored frames."""
+
+    key: str
+    file_name: str
+    content_type: str
+    frames: int
+    # iso times of the first and last frame
+    start: str
+    end: str
+    size: int = 0
+
+
+class RenderCache:
+    """Rendered animations on disk, bounded in bytes and evicted least recently used.
+
+    Renders are keyed by their parameters and the frames they show, so a
+    repeated request returns the stored file as long as no frame of its time
+    window changed. The index is persisted in a manifest file like the
+    response disk cache. A render larger than the bound is kept until the next
+    render.
+
+    The cache is not thread safe, all calls are expected to come from the same
+    (executor) thread.
+    """
+
+    def __init__(self, directory: str, max_size: int) -> None:
+        """Initialize the render cache."""
+        self.directory = directory
+        self.max_size = max_size
+        self._entries: OrderedDict[str, RenderedAnimation] | None = None
+        self._size = 0
+
+    def path(self, render: RenderedAnimation) -> str:
+        """Return the path of a rendered animation."""
+        return join(self.directory, render.file_name)
+
+    def get(self, key: str) -> RenderedAnimation | None:
+        """Return the rendered animation of a key."""
+        entries = self._get_entries()
+        if (render := entries.get(key)) is None:
+            return None
+
+        if not exists(self.path(render)):
+            _LOGGER.debug("Dropping missing render %s", render.file_name)
+            self._remove(key)
+            self._write_manifest()
+            return None
+
+        # the order is persisted with the next write
+        entries.move_to_end(key)
+        return render
+
+    def put(
+        self, render: RenderedAnimation, write: Callable[[BinaryIO], None]
+    ) -> RenderedAnimation:
+        """Write a rendered animation, evicting least recently used renders.
+
+        The size of the render is set once it is written.
+        """
+        entries = self._get_entries()
+        self._remove(render.key)
+
+        makedirs(self.directory, exist_ok=True)
+        path = self.path(render)
+        temp_path = path + ".tmp"
+        try:
+            with open(temp_path, "wb") as file:
+                write(file)
+                render.size = file.tell()
+        except BaseException:
+            with suppress(FileNotFoundError):
+                remove(temp_path)
+            raise
+        replace(temp_path, path)
+
+        entries[render.key] = render
+        self._size += render.size
+        while self._size > self.max_size and len(entries) > 1:
+            self._remove(next(iter(entries)))
+        self._write_manifest()
+        return render
+
+    def _get_entries(self) -> OrderedDict[str, RenderedAnimation]:
+        if self._entries is None:
+            self._entries = OrderedDict((entry.key, entry) for entry in self._load())
+            self._size = sum(entry.size for entry in self._entries.values())
+        return self._entries
+
+    def _remove(self, key: str) -> None:
+        if (entry := self._get_entries().pop(key, None)) is None:
+            return
+        self._size -= entry.size
+        with suppress(FileNotFoundError):
+            remove(join(self.directory, entry.file_name))
+
+    def _load(self) -> list[RenderedAnimation]:
+        manifest_path = join(self.directory, MANIFEST_FILE_NAME)
+        try:
+            with open(manifest_path, encoding="utf-8") as file:
+                manifest = json.load(file)
+            if manifest["version"] != MANIFEST_VERSION:
+                raise ValueError(f"Unsupported manifest version {manifest['version']}")
+            return [RenderedAnimation(**entry) for entry in manifest["entries"]]
+        except FileNotFoundError:
+            return []
+        except (ValueError, KeyError, TypeError) as err:
+            _LOGGER.warning(
+                "Render cache manifest '%s' is corrupt (%s), starting empty",
+                manifest_path,
+                err,
+            )
+            return []
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "entries": [asdict(entry) for entry in self._get_entries().values()],
+        }
+
+        makedirs(self.directory, exist_ok=True)
+        manifest_path = join(self.directory, MANIFEST_FILE_NAME)
+        temp_path = manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file)
+        replace(temp_path, manifest_path)
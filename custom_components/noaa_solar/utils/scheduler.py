@@ -0,0 +1,93 @@
+"""NOAA Solar adaptive polling schedule."""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable
+from random import uniform
+from statistics import median
+
+# publish intervals kept to estimate the cadence
+CADENCE_SAMPLES = 8
+# delay after an expected publish, NOAA files don't appear on the exact second
+PUBLISH_GRACE = 10  # seconds
+MIN_DELAY = 15  # seconds
+# the first retry of a late publish waits this fraction of the cadence
+MISS_BACKOFF_FRACTION = 0.25
+# while nothing changes, the delay doubles up to this multiple of the interval
+MAX_BACKOFF = 4
+MAX_JITTER = 15  # seconds
+
+
+class AdaptiveSchedule:
+    """Poll schedule aligned to the publish cadence of a product.
+
+    The cadence is the median interval between publish times, taken from
+    Last-Modified headers or frame timestamps. Polls are placed just after the
+    expected publish nearest to one interval from now. A poll that finds
+    nothing new is retried with an exponential backoff, starting at a fraction
+    of the cadence but never polling faster than the configured interval,
+    which also thins out polling while a product is not updated, and the
+    regular schedule resumes with the next change. Polls get a random delay,
+    so that products with the same cadence don't fire in the same tick.
+    """
+
+    def __init__(self, interval: float) -> None:
+        """Initialize the schedule with the configured interval in seconds."""
+        self.interval = interval
+        self.published: float | None = None
+        self.misses = 0
+        self._intervals: deque[float] = deque(maxlen=CADENCE_SAMPLES)
+
+    @property
+    def cadence(self) -> float | None:
+        """Return the estimated publish cadence in seconds."""
+        if not self._intervals:
+            return None
+        return median(self._intervals)
+
+    def learn(self, published: Iterable[float]) -> None:
+        """Learn the cadence from publish times, e.g. of a frame listing."""
+        times = sorted(set(published))
+        self._intervals.extend(b - a for a, b in zip(times, times[1:]))
+        if times and (self.published is None or times[-1] > self.published):
+            self.published = times[-1]
+
+    def next_delay(self, now: float, changed: bool, published: float | None) -> float:
+        """Record the result of a poll and return the delay to the next poll.
+
+        The publish time defaults to now for changes of products without one.
+        """
+        if changed:
+            self.misses = 0
+            published = min(published or now, now)
+            if self.published is not None and published > self.published:
+                self._intervals.append(published - self.published)
+            if self.published is None or published > self.published:
+                self.published = published
+        elif (expected := self._expected()) is None or now >= expected:
+            # an expected publish is late
+            self.misses += 1
+
+        delay = self._delay(now)
+        return delay + uniform(0, min(delay * 0.1, MAX_JITTER))
+
+    def _expected(self) -> float | None:
+        """Return the time of the next expected publish, including the grace."""
+        if (cadence := self.cadence) is None or self.published is None:
+            return None
+        return self.published + cadence + PUBLISH_GRACE
+
+    def _delay(self, now: float) -> float:
+        if (cadence := self.cadence) is None or self.published is None:
+            return self.interval
+
+        if self.misses:
+            backoff = cadence * MISS_BACKOFF_FRACTION * 2 ** (self.misses - 1)
+            return min(max(backoff, self.interval), self.interval * MAX_BACKOFF)
+
+        # expected publish nearest to one interval from now
+        target = now + self.interval - PUBLISH_GRACE
+        publishes = max(round((target - self.published) / cadence), 1)
+        expected = self.published + publishes * cadence + PUBLISH_GRACE
+        return max(expected - now, MIN_DELAY)
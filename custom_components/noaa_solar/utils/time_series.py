@@ -0,0 +1,196 @@
+"""NOAA Solar time series utils."""
+
+from __future__ import annotations
+
+from array import array
+from base64 import b64decode, b64encode
+from bisect import bisect_right
+from collections.abc import Iterator, Sequence
+from math import isnan, nan
+from typing import Any
+
+from .decoders import TimeSeriesTable
+
+PERCENTILES = (10, 50, 90)
+HOUR = 60 * 60
+
+
+class TimeSeries:
+    """Fixed-size ring buffer of time series rows.
+
+    Timestamps and every column are kept in typed arrays, so a week of minute
+    data takes a few hundred kilobytes instead of millions of Python objects.
+    Rows are merged incrementally from decoded columnar tables, only rows newer
+    than the newest stored row are copied.
+    """
+
+    def __init__(self, columns: Sequence[str], capacity: int) -> None:
+        """Initialize the time series."""
+        self.columns = tuple(columns)
+        self.capacity = capacity
+        self.times = array("d", [0.0]) * capacity
+        self.values = {column: array("d", [nan]) * capacity for column in columns}
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Return the number of stored rows."""
+        return self._size
+
+    @property
+    def last_time(self) -> float | None:
+        """Return the timestamp of the newest row."""
+        if not self._size:
+            return None
+        return self.times[self._index(self._size - 1)]
+
+    def merge(self, table: TimeSeriesTable) -> int:
+        """Merge the rows of a decoded product table, return the number of new rows."""
+        # rows are time ordered, skip up to the newest stored row
+        first_new = 0
+        if (last_time := self.last_time) is not None:
+            first_new = bisect_right(table.times, last_time)
+
+        for index in range(max(first_new, len(table) - self.capacity), len(table)):
+            self._append(
+                table.times[index],
+                [table.columns[column][index] for column in self.columns],
+            )
+
+        return len(table) - first_new
+
+    def latest(self, column: str) -> float | None:
+        """Return the newest value of a column, skipping missing values."""
+        for _, value in self._iter_back(column, None):
+            return value
+        return None
+
+    def stats(self, column: str, since: float) -> dict[str, float] | None:
+        """Return min, max, mean and percentiles of a column since a timestamp."""
+        window = sorted(value for _, value in self._iter_back(column, since))
+        if not window:
+            return None
+
+        stats = {
+            "min": window[0],
+            "max": window[-1],
+            "mean": sum(window) / len(window),
+        }
+        for percentile in PERCENTILES:
+            rank = round(percentile / 100 * (len(window) - 1))
+            stats[f"p{percentile}"] = window[rank]
+        return stats
+
+    def hourly(
+        self, column: str, since: float, until: float
+    ) -> list[tuple[float, float, float, float]]:
+        """Return (hour start, mean, min, max) of the complete hours of a column.
+
+        Only hours starting at or after since and ending at or before until are
+        returned.
+        """
+        values = self.values[column]
+        hours = []
+        hour = None
+        window: list[float] = []
+        for position in range(self._first_position(since), self._size):
+            index = self._index(position)
+            timestamp = self.times[index]
+            if timestamp >= until:
+                break
+
+            row_hour = timestamp - timestamp % HOUR
+            if row_hour != hour:
+                if window:
+                    hours.append(_aggregate(hour, window))
+                hour = row_hour
+                window = []
+            if not isnan(value := values[index]):
+                window.append(value)
+
+        if window and hour is not None and hour + HOUR <= until:
+            hours.append(_aggregate(hour, window))
+        return hours
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a compact, persistable representation of the time series."""
+        return {
+            "columns": list(self.columns),
+            "times": _pack(self._ordered(self.times)),
+            "values": {
+                column: _pack(self._ordered(values))
+                for column, values in self.values.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any], capacity: int) -> TimeSeries:
+        """Create a time series from its persisted representation."""
+        series = cls(data["columns"], capacity)
+        times = _unpack(data["times"])
+        values = {column: _unpack(data["values"][column]) for column in series.columns}
+        for index in range(max(len(times) - capacity, 0), len(times)):
+            series._append(
+                times[index], [values[column][index] for column in series.columns]
+            )
+        return series
+
+    def _append(self, timestamp: float, row: list[float]) -> None:
+        if self._size < self.capacity:
+            index = self._index(self._size)
+            self._size += 1
+        else:
+            # full, overwrite the oldest row
+            index = self._start
+            self._start = (self._start + 1) % self.capacity
+
+        self.times[index] = timestamp
+        for column, value in zip(self.columns, row):
+            self.values[column][index] = value
+
+    def _iter_back(
+        self, column: str, since: float | None
+    ) -> Iterator[tuple[float, float]]:
+        """Iterate the values of a column from newest to oldest."""
+        values = self.values[column]
+        for position in range(self._size - 1, -1, -1):
+            index = self._index(position)
+            timestamp = self.times[index]
+            if since is not None and timestamp < since:
+                return
+            if not isnan(value := values[index]):
+                yield timestamp, value
+
+    def _first_position(self, since: float) -> int:
+        """Return the position of the oldest row at or after a timestamp."""
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            if self.times[self._index(middle)] < since:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _ordered(self, values: array) -> array:
+        end = self._start + self._size
+        if end <= self.capacity:
+            return values[self._start : end]
+        return values[self._start :] + values[: end - self.capacity]
+
+    def _index(self, position: int) -> int:
+        return (self._start + position) % self.capacity
+
+
+def _aggregate(hour: float, window: list[float]) -> tuple[float, float, float, float]:
+    return hour, sum(window) / len(window), min(window), max(window)
+
+
+def _pack(values: array) -> str:
+    return b64encode(values.tobytes()).decode("ascii")
+
+
+def _unpack(data: str) -> array:
+    values = array("d")
+    values.frombytes(b64decode(data))
+    return values